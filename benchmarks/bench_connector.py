@@ -0,0 +1,200 @@
+# Copyright (c) 2025-2026 Splunk Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# File: bench_connector.py
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+
+
+"""
+End to end benchmark of the connector against the local Darktrace API stand-in.
+
+Measures on_poll throughput and peak memory, and the latency of the other actions. SOAR saves
+are stubbed, so only the connector's own work and its API traffic are measured. The stand-in
+runs in a separate process. The Splunk SOAR app SDK (`phantom`) must be importable.
+
+Run from the app directory with `python -m benchmarks.bench_connector`
+"""
+
+import argparse
+import statistics
+import tempfile
+import time
+import tracemalloc
+from typing import Any
+
+from darktrace_connector import DarktraceConnector
+
+from .darktrace_stand_in import PRIVATE_TOKEN, TOKEN, StandInConfig, add_config_arguments, config_from_arguments, start_in_subprocess
+
+
+ACTIONS = {
+    "test_connectivity": {},
+    "get_device_description": {"device_id": 42},
+    "get_device_model_breaches": {"device_id": 42},
+    "get_device_tags": {"device_id": 40},
+    "get_tagged_devices": {"tag": "Admin"},
+    "post_tag": {"device_id": 42, "tag": "Manual Antigena - Quarantine", "duration": 600},
+    "get_breach_comments": {"model_breach_id": 1234},
+    "post_comment": {"model_breach_id": 1234, "message": "Benchmark comment"},
+    "acknowledge_breach": {"model_breach_id": 1234},
+    "unacknowledge_breach": {"model_breach_id": 1234},
+    "get_breach_connections": {"model_breach_id": "1234"},
+    "enrich_devices": {"device_ids": ",".join(str(did) for did in range(1, 51))},
+    "bulk_acknowledge_breaches": {"model_breach_ids": ",".join(str(pbid) for pbid in range(1, 51))},
+}
+
+
+class BenchConnector(DarktraceConnector):
+    """DarktraceConnector with asset config, state and SOAR saves stubbed in memory"""
+
+    def __init__(self, config: dict[str, Any], state: dict[str, Any], state_dir: str, action_id: str):
+        super().__init__()
+        self._bench_config = config
+        self._bench_state = state
+        self._state_dir = state_dir
+        self._action_id = action_id
+        self.containers_saved = 0
+        self.artifacts_saved = 0
+
+    def get_config(self):
+        return self._bench_config
+
+    def load_state(self):
+        return self._bench_state
+
+    def save_state(self, state):
+        if state is not self._bench_state:
+            self._bench_state.clear()
+            self._bench_state.update(state)
+
+    def get_state_dir(self):
+        return self._state_dir
+
+    def get_action_identifier(self):
+        return self._action_id
+
+    def is_poll_now(self):
+        return False
+
+    def save_container(self, container):
+        self.containers_saved += 1
+        self.artifacts_saved += len(container.get("artifacts", []))
+        return True, "", self.containers_saved
+
+    def save_artifacts(self, artifacts):
+        self.artifacts_saved += len(artifacts)
+        return True, "", list(range(len(artifacts)))
+
+    def save_progress(self, *args, **kwargs):
+        pass
+
+    def debug_print(self, *args, **kwargs):
+        pass
+
+
+def run_action(config: dict[str, Any], state: dict[str, Any], state_dir: str, action_id: str, param: dict) -> tuple[bool, BenchConnector, float]:
+    """Run one action the way SOAR does. Returns a tuple of (status, connector, seconds)"""
+    connector = BenchConnector(config, state, state_dir, action_id)
+    start = time.perf_counter()
+    status = connector.initialize()
+    if status:
+        status = connector.handle_action(param)
+    connector.finalize()
+    return status, connector, time.perf_counter() - start
+
+
+def bench_poll(config: dict[str, Any], state_dir: str, runs: int):
+    """Poll the full lookback from empty state, once per run, and once more under tracemalloc for the peak memory"""
+    print(f"\non_poll, {config['mb_first_run_lookback_hours']}h of data from empty state")
+    print(
+        f"{'run':<8}{'seconds':>10}{'containers':>12}{'artifacts':>11}{'containers/s':>14}{'fetch s':>9}{'parse s':>9}{'build s':>9}{'save s':>8}"
+    )
+    for run in range(runs):
+        status, connector, seconds = run_action(config, {}, state_dir, "on_poll", {})
+        metrics = connector.get_action_results()[-1].get_summary()
+        print(
+            f"{run + 1:<8}{seconds:>10.2f}{connector.containers_saved:>12}{connector.artifacts_saved:>11}"
+            f"{connector.containers_saved / seconds:>14.0f}{metrics.get('fetch_seconds', 0):>9.2f}{metrics.get('parse_seconds', 0):>9.2f}"
+            f"{metrics.get('build_seconds', 0):>9.2f}{metrics.get('save_seconds', 0):>8.2f}" + ("" if status else "  FAILED")
+        )
+
+    tracemalloc.start()
+    run_action(config, {}, state_dir, "on_poll", {})
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"peak traced memory: {peak / 2**20:.1f} MiB")
+
+
+def bench_actions(config: dict[str, Any], state_dir: str, iterations: int):
+    """Run every other action `iterations` times and report its latency"""
+    print(f"\n{'action':<28}{'min ms':>9}{'median ms':>11}{'p95 ms':>9}{'failed':>8}")
+    for action_id, param in ACTIONS.items():
+        latencies = []
+        failed = 0
+        for _ in range(iterations):
+            status, _, seconds = run_action(config, {}, state_dir, action_id, dict(param))
+            latencies.append(seconds * 1000)
+            failed += not status
+        latencies.sort()
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        print(f"{action_id:<28}{latencies[0]:>9.1f}{statistics.median(latencies):>11.1f}{p95:>9.1f}{failed:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hours", type=int, default=24, help="Hours of data polled by on_poll")
+    parser.add_argument("--runs", type=int, default=3, help="on_poll runs")
+    parser.add_argument("--iterations", type=int, default=20, help="Runs of every other action")
+    parser.add_argument("--cache", action="store_true", help="Enable the device and tag response cache")
+    parser.add_argument("--rate-limit", type=float, help="Requests per second allowed by the connector, its default if unset")
+    add_config_arguments(parser, StandInConfig())
+    args = parser.parse_args()
+
+    stand_in_config = config_from_arguments(args)
+    process, base_url = start_in_subprocess(stand_in_config)
+    print(f"Darktrace stand-in at {base_url}: {stand_in_config}")
+    config = {
+        "base_url": base_url,
+        "public_token": TOKEN,
+        "private_token": PRIVATE_TOKEN,
+        "tls_verify": False,
+        "poll_mb": True,
+        "poll_aia": True,
+        "mb_first_run_lookback_hours": args.hours,
+        "aia_first_run_lookback_hours": args.hours,
+        "max_catchup_hours": args.hours,
+        "dedup_retention_hours": max(args.hours, 72),
+        "cache_enabled": args.cache,
+    }
+    if args.rate_limit:
+        config["rate_limit"] = args.rate_limit
+    try:
+        with tempfile.TemporaryDirectory() as state_dir:
+            bench_poll(config, state_dir, args.runs)
+            bench_actions(config, state_dir, args.iterations)
+    finally:
+        process.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# Copyright (c) 2025-2026 Splunk Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# File: bench_nget.py
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+
+
+"""
+Microbenchmark of extracting fields from model breaches.
+
+Compares the slicing nget the app used before, the current nget, a compiled npath per field
+and a single NPaths extraction of all the fields a model breach container and artifact use.
+
+Run from the app directory with `python -m benchmarks.bench_nget`
+"""
+
+import argparse
+import timeit
+
+from darktrace.darktrace_utils import NPaths, nget, npath
+
+
+MODEL_BREACH = {
+    "pbid": 1234,
+    "time": 1735689600000,
+    "score": 0.87,
+    "model": {
+        "then": {
+            "name": "Device::Suspicious Network Scan Activity",
+            "category": "Suspicious",
+            "description": "A device is scanning the network",
+        },
+        "now": {"actions": {"antigena": {"action": "quarantine", "duration": 3600}}},
+    },
+    # No devicelabel, so one path takes the default
+    "device": {"did": 42, "ip": "10.0.0.42", "hostname": "workstation-42"},
+}
+
+PATHS = (
+    ("model", "then", "category"),
+    ("model", "then", "compliance"),
+    ("model", "then", "name"),
+    ("model", "then", "description"),
+    ("device", "did"),
+    ("device", "hostname"),
+    ("device", "devicelabel"),
+    ("device", "ip"),
+)
+
+
+def legacy_nget(structure, *fields, default="Unknown"):
+    """nget as it was before, slicing the fields at every level"""
+    while fields:
+        try:
+            structure = structure[fields[0]]
+        except (KeyError, TypeError, IndexError):
+            return default
+
+        fields = fields[1:]
+    if structure is None or structure == "":
+        return default
+    return structure
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=100000, help="Model breaches per measurement")
+    parser.add_argument("--repeat", type=int, default=5, help="Measurements per implementation, the best is reported")
+    args = parser.parse_args()
+
+    accessors = [npath(*path) for path in PATHS]
+    extractor = NPaths(*PATHS)
+    implementations = {
+        "legacy nget": lambda: tuple(legacy_nget(MODEL_BREACH, *path) for path in PATHS),
+        "nget": lambda: tuple(nget(MODEL_BREACH, *path) for path in PATHS),
+        "npath": lambda: tuple(accessor(MODEL_BREACH) for accessor in accessors),
+        "NPaths": lambda: extractor(MODEL_BREACH),
+    }
+
+    expected = implementations["legacy nget"]()
+    baseline = None
+    print(f"{'implementation':<16}{'per breach (us)':>17}{'speedup':>10}")
+    for name, extract in implementations.items():
+        assert extract() == expected
+        best = min(timeit.repeat(extract, number=args.number, repeat=args.repeat))
+        baseline = baseline or best
+        print(f"{name:<16}{best / args.number * 1e6:>17.2f}{baseline / best:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# Copyright (c) 2025-2026 Splunk Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# File: bench_signing.py
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+
+
+"""
+Microbenchmark of the per-request cost of signing Darktrace API requests.
+
+Compares SigningContext with signing the way the client did before it, which encoded the
+query string twice for url-encoded posts and keyed a new HMAC for every request.
+
+Run from the app directory with `python -m benchmarks.bench_signing`
+"""
+
+import argparse
+import hashlib
+import hmac
+import json
+import timeit
+
+from darktrace.client.darktrace_signing import SigningContext
+from darktrace.darktrace_utils import stringify_data
+
+
+TOKEN = "0123456789abcdef0123456789abcdef01234567"
+PRIVATE_TOKEN = "fedcba9876543210fedcba9876543210fedcba98"
+DATE = "2025-01-01T00:00:00.000000+00:00"
+
+REQUESTS = {
+    "get": ("/modelbreaches", {"from": "2025-01-01T00:00:00.00Z", "to": "2025-01-01T01:00:00.00Z", "includeacknowledged": "true"}, False),
+    "urlencoded post": ("/tags/entities", {"did": 1234, "tag": "Manual Antigena - Quarantine", "duration": 3600}, False),
+    "json post": ("/mbcomments", {"message": "Closed as part of incident response"}, True),
+}
+
+
+def legacy_sign(query_uri: str, query_data: dict, is_json: bool, urlencoded: bool) -> str:
+    """Sign a request as the client did before SigningContext"""
+    if urlencoded:
+        stringify_data(query_data)
+    if is_json:
+        query_string = f"?{json.dumps(query_data)}"
+    else:
+        query_string = f"?{stringify_data(query_data)}" if query_data else ""
+    return hmac.new(PRIVATE_TOKEN.encode("ASCII"), f"{query_uri}{query_string}\n{TOKEN}\n{DATE}".encode("ASCII"), hashlib.sha1).hexdigest()
+
+
+def context_sign(signing: SigningContext, query_uri: str, query_data: dict, is_json: bool) -> str:
+    """Sign a request with a SigningContext"""
+    return signing.sign(query_uri, DATE, signing.query_string(query_data, is_json=is_json))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=200000, help="Signatures per measurement")
+    parser.add_argument("--repeat", type=int, default=5, help="Measurements per request type, the best is reported")
+    args = parser.parse_args()
+
+    signing = SigningContext(TOKEN, PRIVATE_TOKEN)
+    print(f"{'request':<18}{'legacy (us)':>14}{'context (us)':>14}{'speedup':>10}")
+    for name, (query_uri, query_data, is_json) in REQUESTS.items():
+        urlencoded = name == "urlencoded post"
+        assert legacy_sign(query_uri, query_data, is_json, urlencoded) == context_sign(signing, query_uri, query_data, is_json)
+
+        legacy = min(timeit.repeat(lambda: legacy_sign(query_uri, query_data, is_json, urlencoded), number=args.number, repeat=args.repeat))
+        context = min(timeit.repeat(lambda: context_sign(signing, query_uri, query_data, is_json), number=args.number, repeat=args.repeat))
+        print(f"{name:<18}{legacy / args.number * 1e6:>14.2f}{context / args.number * 1e6:>14.2f}{legacy / context:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,425 @@
+# Copyright (c) 2025-2026 Splunk Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# File: darktrace_stand_in.py
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+
+
+"""
+Local stand-in for the Darktrace API, for benchmarking the connector offline.
+
+Serves the endpoints the connector uses with generated data. Model breaches and AI Analyst
+incident events occur at a fixed rate over time, and are derived from their position in time,
+so the same time range always returns the same data whatever the size of the data set.
+Every request must carry a valid HMAC signature, checked with the same signing as the client.
+
+Run from the app directory with `python -m benchmarks.darktrace_stand_in`, or start it from a
+benchmark with `start_in_process` or `start_in_subprocess`.
+"""
+
+import argparse
+import dataclasses
+import hmac
+import json
+import multiprocessing
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Optional
+from urllib.parse import parse_qsl, urlsplit
+
+from darktrace.client.darktrace_signing import SigningContext
+from darktrace.darktrace_consts import (
+    ACK_BREACH,
+    AI_ANALYST_ENDPOINT,
+    COMMENT_BREACH,
+    DEVICE_SUMMARY_ENDPOINT,
+    DEVICES_ENDPOINT,
+    MODEL_BREACH_COMMENT_ENDPOINT,
+    MODEL_BREACH_CONNECTIONS_ENDPOINT,
+    MODEL_BREACH_ENDPOINT,
+    TAG_ENTITIES_ENDPOINT,
+    TEST_CONNECTIVITY_ENDPOINT,
+    UNACK_BREACH,
+)
+from darktrace.darktrace_utils import POLL_TIME_FORMAT, stringify_data
+
+
+TOKEN = "standin-public-token"
+PRIVATE_TOKEN = "standin-private-token"
+
+MODELS = (
+    ("Device::Suspicious Network Scan Activity", "Suspicious"),
+    ("Anomalous Connection::Data Sent to Rare Domain", "Critical"),
+    ("Compromise::Beaconing Activity To External Rare", "Critical"),
+    ("Compliance::Remote Desktop Protocol", "Compliance"),
+    ("Antigena::Network::External Threat::Antigena Suspicious File Block", "Critical"),
+    ("System::System", "Informational"),
+)
+INCIDENT_CATEGORIES = ("critical", "suspicious", "compliance")
+
+
+@dataclasses.dataclass
+class StandInConfig:
+    """Size and behaviour of the generated data set"""
+
+    breaches_per_hour: int = 600
+    events_per_hour: int = 60
+    events_per_incident: int = 3
+    devices: int = 1000
+    connections_per_breach: int = 500
+    comments_per_breach: int = 3
+    latency_ms: float = 0.0
+    error_rate: float = 0.0
+    seed: int = 0
+    # Order of the model breaches in a response: "oldest" first, "newest" first or "shuffled"
+    breach_order: str = "oldest"
+
+
+class StandInServer(ThreadingHTTPServer):
+    """Threading HTTP server holding the data set configuration and request counters"""
+
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], config: StandInConfig):
+        super().__init__(address, StandInRequestHandler)
+        self.config = config
+        self.signing = SigningContext(TOKEN, PRIVATE_TOKEN)
+        self.counts = {"requests": 0, "rejected": 0, "errors": 0}
+        self._lock = threading.Lock()
+
+    def count(self, name: str):
+        with self._lock:
+            self.counts[name] += 1
+
+    def handle_error(self, request, client_address):
+        """Ignore clients closing a response early, as polls that stop on their budget do"""
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class StandInRequestHandler(BaseHTTPRequestHandler):
+    """Routes signed requests to the generated data"""
+
+    protocol_version = "HTTP/1.1"
+    server: StandInServer
+
+    def log_message(self, format: str, *args: Any):
+        pass
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def _handle(self, method: str):
+        url = urlsplit(self.path)
+        params = dict(parse_qsl(url.query, keep_blank_values=True))
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0)).decode()
+        self.server.count("requests")
+
+        if not self._verify_signature(url.path, url.query, body):
+            self.server.count("rejected")
+            self._send(HTTPStatus.UNAUTHORIZED, {"error": "API SIGNATURE ERROR"})
+            return
+
+        config = self.server.config
+        if config.latency_ms:
+            time.sleep(config.latency_ms / 1000)
+        if config.error_rate and random.random() < config.error_rate:
+            self.server.count("errors")
+            self._send(HTTPStatus.SERVICE_UNAVAILABLE, {"error": "Service unavailable"})
+            return
+
+        generator = DataGenerator(config)
+        path = url.path
+        if method == "GET" and path == MODEL_BREACH_ENDPOINT:
+            self._send(HTTPStatus.OK, generator.model_breaches(_parse_time(params["from"]), _parse_time(params["to"])))
+        elif method == "GET" and path == AI_ANALYST_ENDPOINT:
+            self._send(HTTPStatus.OK, generator.incident_events(int(params["starttime"]), int(params["endtime"])))
+        elif method == "GET" and path == MODEL_BREACH_CONNECTIONS_ENDPOINT:
+            self._send(HTTPStatus.OK, generator.connections(params))
+        elif method == "GET" and path == DEVICE_SUMMARY_ENDPOINT:
+            self._send(HTTPStatus.OK, generator.device_summary(int(params["did"])))
+        elif method == "GET" and path == DEVICES_ENDPOINT:
+            self._send(HTTPStatus.OK, generator.device(int(params["did"])))
+        elif method == "GET" and path == TAG_ENTITIES_ENDPOINT:
+            if "did" in params:
+                self._send(HTTPStatus.OK, generator.device_tags(int(params["did"])))
+            else:
+                self._send(HTTPStatus.OK, generator.tagged_devices(params["tag"]))
+        elif method == "POST" and path == TAG_ENTITIES_ENDPOINT:
+            self._send(HTTPStatus.OK, {"entityType": "Device", "entityValue": dict(parse_qsl(body))["did"], "tid": 1})
+        elif method == "GET" and path == MODEL_BREACH_COMMENT_ENDPOINT:
+            self._send(HTTPStatus.OK, generator.comments(int(params["pbid"])))
+        elif method == "POST" and path.startswith(MODEL_BREACH_ENDPOINT) and path.endswith(COMMENT_BREACH):
+            self._send(HTTPStatus.OK, {"time": int(time.time() * 1000), "username": "standin", "message": json.loads(body)["message"]})
+        elif method == "POST" and path.startswith(MODEL_BREACH_ENDPOINT) and path.endswith((ACK_BREACH, UNACK_BREACH)):
+            self._send(HTTPStatus.OK, {"response": "SUCCESS"})
+        elif method == "GET" and path == TEST_CONNECTIVITY_ENDPOINT:
+            self._send(HTTPStatus.OK, {"usercredentialcount": 1, "subnets": 16, "devices": config.devices})
+        else:
+            self._send(HTTPStatus.NOT_FOUND, {"error": f"No stand-in for {method} {path}"})
+
+    def _verify_signature(self, path: str, raw_query: str, body: str) -> bool:
+        """Check the signature against the query string as the client signed it, before url encoding"""
+        if self.headers.get("DTAPI-Token") != TOKEN:
+            return False
+        date = self.headers.get("DTAPI-Date", "")
+        candidates = [stringify_data(dict(parse_qsl(raw_query, keep_blank_values=True)))]
+        if body:
+            # JSON and pre-encoded form bodies are signed as sent, other form bodies as decoded
+            candidates = [body, stringify_data(dict(parse_qsl(body, keep_blank_values=True)))]
+        signature = self.headers.get("DTAPI-Signature", "")
+        return any(hmac.compare_digest(self.server.signing.sign(path, date, query_string), signature) for query_string in candidates)
+
+    def _send(self, status: HTTPStatus, payload: Any):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json;charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class DataGenerator:
+    """
+    Generates realistic Darktrace API data. Every object is derived from its id with a seeded
+    random generator, so it is the same in every response.
+    """
+
+    def __init__(self, config: StandInConfig):
+        self.config = config
+
+    def _random(self, kind: str, key: int) -> random.Random:
+        return random.Random(f"{self.config.seed}:{kind}:{key}")
+
+    @staticmethod
+    def _ids_in_range(per_hour: int, start_ms: int, end_ms: int) -> tuple[int, range]:
+        """Interval between occurrences in milliseconds, and the ids of the occurrences in a time range"""
+        interval = max(3600000 // max(per_hour, 1), 1)
+        return interval, range(-(-start_ms // interval), end_ms // interval + 1)
+
+    def model_breaches(self, start_ms: int, end_ms: int) -> list[dict]:
+        interval, pbids = self._ids_in_range(self.config.breaches_per_hour, start_ms, end_ms)
+        breaches = [self.model_breach(pbid, pbid * interval) for pbid in pbids]
+        if self.config.breach_order == "newest":
+            breaches.reverse()
+        elif self.config.breach_order == "shuffled":
+            self._random("order", start_ms).shuffle(breaches)
+        return breaches
+
+    def model_breach(self, pbid: int, time_ms: int) -> dict:
+        rand = self._random("breach", pbid)
+        name, category = rand.choice(MODELS)
+        did = rand.randrange(1, self.config.devices + 1)
+        breach = {
+            "pbid": pbid,
+            "time": time_ms,
+            "creationTime": time_ms + rand.randrange(1000, 60000),
+            "commentCount": self.config.comments_per_breach,
+            "score": round(rand.uniform(0.2, 1.0), 3),
+            "acknowledged": False,
+            "model": {
+                "then": {
+                    "name": name,
+                    "pid": MODELS.index((name, category)) + 1,
+                    "uuid": f"{MODELS.index((name, category)):08d}-0000-4000-8000-000000000000",
+                    "category": category,
+                    "compliance": category == "Compliance",
+                    "description": f"A device has triggered the {name.split('::')[-1]} model.\n\nAction: Review the device activity.",
+                    "tags": ["AP: Exfiltration"] if category == "Critical" else [],
+                },
+                "now": {"actions": {}},
+            },
+            "triggeredComponents": [
+                {"time": time_ms, "cbid": pbid * 10 + index, "metric": {"mlid": 1, "name": "externalconnections"}, "threshold": 1}
+                for index in range(rand.randrange(1, 4))
+            ],
+            "device": self.device(did),
+        }
+        if name.startswith("Antigena"):
+            breach["model"]["now"]["actions"]["antigena"] = {"action": "quarantine", "duration": rand.choice((600, 3600, 86400))}
+        return breach
+
+    def incident_events(self, start_ms: int, end_ms: int) -> list[dict]:
+        interval, event_ids = self._ids_in_range(self.config.events_per_hour, start_ms, end_ms)
+        return [self.incident_event(event_id, event_id * interval) for event_id in event_ids]
+
+    def incident_event(self, event_id: int, time_ms: int) -> dict:
+        rand = self._random("event", event_id)
+        group = event_id // max(self.config.events_per_incident, 1)
+        device = self.device(self._random("group", group).randrange(1, self.config.devices + 1))
+        return {
+            "id": f"{event_id:08x}-0000-4000-8000-aia000000000",
+            "currentGroup": f"{group:08x}-0000-4000-8000-group0000000",
+            "groupCategory": rand.choice(INCIDENT_CATEGORIES),
+            "groupScore": round(rand.uniform(10, 100), 2),
+            "aiaScore": rand.randrange(1, 100),
+            "title": "Possible HTTP Command and Control",
+            "summary": "The device was observed making repeated connections to a rare external endpoint.",
+            "periods": [{"start": time_ms - 600000, "end": time_ms}],
+            "breachDevices": [{"did": device["did"], "hostname": device["hostname"], "ip": device["ip"], "identifier": device["hostname"]}],
+            "relatedBreaches": [
+                {
+                    "modelName": "Anomalous Connection / Data Sent to Rare Domain",
+                    "pbid": event_id * 7 + index,
+                    "threatScore": 60,
+                    "timestamp": time_ms,
+                }
+                for index in range(rand.randrange(0, 3))
+            ],
+        }
+
+    def device(self, did: int) -> dict:
+        rand = self._random("device", did)
+        return {
+            "did": did,
+            "ip": f"10.{did // 65536 % 256}.{did // 256 % 256}.{did % 256}",
+            "macaddress": ":".join(f"{rand.randrange(256):02x}" for _ in range(6)),
+            "hostname": f"host-{did}.example.com",
+            "devicelabel": f"Workstation {did}" if rand.random() < 0.3 else "",
+            "typename": rand.choice(("desktop", "laptop", "server")),
+            "firstSeen": 1600000000000,
+            "lastSeen": int(time.time() * 1000),
+        }
+
+    def device_summary(self, did: int) -> dict:
+        device = self.device(did)
+        breaches = [self.model_breach(did * 1000 + index, int(time.time() * 1000) - index * 60000) for index in range(3)]
+        return {"data": {**device, "devicelabel": device["devicelabel"] or device["hostname"], "modelbreaches": breaches}}
+
+    def device_tags(self, did: int) -> list[dict]:
+        return [{"tid": 1, "name": "Admin", "restricted": False, "data": {"color": 200}}] if did % 5 == 0 else []
+
+    def tagged_devices(self, tag: str) -> dict:
+        dids = range(5, min(self.config.devices, 500) + 1, 5)
+        return {
+            "entities": [{"entityType": "Device", "entityValue": str(did), "tag": tag, "expiry": 0} for did in dids],
+            "devices": [self.device(did) for did in dids],
+        }
+
+    def connections(self, params: dict[str, str]) -> list[dict]:
+        pbid = int(params["pbid"])
+        rand = self._random("connections", pbid)
+        src = self.device(rand.randrange(1, self.config.devices + 1))
+        start = int(params.get("starttime", 0))
+        end = int(params.get("endtime", 2**62))
+        connections = []
+        for index in range(self.config.connections_per_breach):
+            time_ms = 1700000000000 + pbid * 1000 + index * 250
+            if not start <= time_ms <= end:
+                continue
+            connections.append(
+                {
+                    "time": time_ms,
+                    # New and unusual connections are only a filter, the events are still connections
+                    "eventType": "connection",
+                    "action": "connection",
+                    "protocol": "TCP",
+                    "applicationprotocol": rand.choice(("HTTP", "HTTPS", "DNS")),
+                    "sourcePort": rand.randrange(49152, 65536),
+                    "destinationPort": rand.choice((80, 443, 53, 8080)),
+                    "sourceDevice": {"hostname": src["hostname"], "ip": src["ip"]},
+                    "destinationDevice": {"hostname": f"rare-{index % 7}.example.net", "ip": f"203.0.113.{index % 7 + 1}"},
+                }
+            )
+            if params.get("count") and len(connections) >= int(params["count"]):
+                break
+        return connections
+
+    def comments(self, pbid: int) -> list[dict]:
+        return [
+            {"time": 1700000000000 + index * 60000, "username": f"analyst{index}", "message": f"Comment {index} on breach {pbid}"}
+            for index in range(self.config.comments_per_breach)
+        ]
+
+
+def _parse_time(value: str) -> int:
+    """Epoch milliseconds of a model breach time range parameter"""
+    return int(datetime.strptime(value, POLL_TIME_FORMAT).replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def start_in_process(config: StandInConfig, host: str = "127.0.0.1", port: int = 0) -> StandInServer:
+    """Start the stand-in on a background thread of this process. Stop it with `shutdown`."""
+    server = StandInServer((host, port), config)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _serve(config: StandInConfig, host: str, port: int, address_queue: "multiprocessing.Queue"):
+    server = StandInServer((host, port), config)
+    address_queue.put(server.server_address[:2])
+    server.serve_forever()
+
+
+def start_in_subprocess(config: StandInConfig, host: str = "127.0.0.1", port: int = 0) -> tuple[multiprocessing.Process, str]:
+    """
+    Start the stand-in in a separate process, so its work and memory do not count towards measurements.
+
+    Returns a tuple of (process, base URL). Stop it with `process.terminate()`.
+    """
+    context = multiprocessing.get_context("spawn")
+    address_queue = context.Queue()
+    process = context.Process(target=_serve, args=(config, host, port, address_queue), daemon=True)
+    process.start()
+    bound_host, bound_port = address_queue.get(timeout=30)
+    return process, f"http://{bound_host}:{bound_port}"
+
+
+def add_config_arguments(parser: argparse.ArgumentParser, defaults: Optional[StandInConfig] = None):
+    """Add an argument for every StandInConfig field"""
+    defaults = defaults or StandInConfig()
+    for field in dataclasses.fields(StandInConfig):
+        parser.add_argument(f"--{field.name.replace('_', '-')}", type=field.type, default=getattr(defaults, field.name))
+
+
+def config_from_arguments(args: argparse.Namespace) -> StandInConfig:
+    """StandInConfig from parsed arguments"""
+    return StandInConfig(**{field.name: getattr(args, field.name) for field in dataclasses.fields(StandInConfig)})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8443)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    server = StandInServer((args.host, args.port), config_from_arguments(args))
+    print(f"Darktrace stand-in on http://{args.host}:{server.server_address[1]} (token {TOKEN!r}, private token {PRIVATE_TOKEN!r})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"Served {server.counts}")
+
+
+if __name__ == "__main__":
+    main()
@@ -28,7 +28,13 @@ from dataclasses import dataclass
 from datetime import datetime
 from typing import Any
 
-from ..darktrace_utils import SplunkSeverity, nget
+from ..darktrace_utils import NPaths, SplunkSeverity, npath
+
+
+EVENT_DEVICE_FIELDS = NPaths(("breachDevices", 0, "identifier"), ("breachDevices", 0, "ip"), default="")
+EVENT_PERIOD_START = npath("periods", 0, "start")
+EVENT_PERIOD_END = npath("periods", 0, "end")
+BREACH_DEVICE_FIELDS = NPaths((0, "did"), (0, "hostname"), (0, "ip"), (0, "identifier"))
 
 
 @dataclass
@@ -42,8 +48,7 @@ class AIAnalystContainer:
 
     def __init__(self, incident_id: str, incident_events: list[dict]):
         event = incident_events[len(incident_events) - 1]
-        device_name = nget(event, "breachDevices", 0, "identifier", default="")
-        ip = nget(event, "breachDevices", 0, "ip", default="")
+        device_name, ip = EVENT_DEVICE_FIELDS(event)
 
         self.name = f"AI Analyst found incident for {device_name or ip}"
         self.description = self.name
@@ -73,9 +78,9 @@ class AIAnalystArtifact:
     cef: dict
 
     def __init__(self, incident: dict[str, Any], container_id: str, base_url: str):
-        start_time = nget(incident, "periods", 0, "start")
+        start_time = EVENT_PERIOD_START(incident)
         start_formatted = datetime.fromtimestamp(start_time // 1000).strftime("%Y-%m-%dT%H:%M:%S.00Z")
-        end_time = nget(incident, "periods", 0, "end")
+        end_time = EVENT_PERIOD_END(incident)
         end_formatted = datetime.fromtimestamp(end_time / 1000).strftime("%Y-%m-%dT%H:%M:%S.00Z")
 
         breach_devices = incident.get("breachDevices", [])
@@ -98,10 +103,7 @@ class AIAnalystArtifact:
         """Get the CEF (Common Event Format) data from the model breach devices"""
         cef = dict()
         if breach_devices:
-            cef["deviceId"] = nget(breach_devices, 0, "did")
-            cef["deviceHostname"] = nget(breach_devices, 0, "hostname")
-            cef["deviceAddress"] = nget(breach_devices, 0, "ip")
-            cef["deviceLabel"] = nget(breach_devices, 0, "identifier")
+            cef["deviceId"], cef["deviceHostname"], cef["deviceAddress"], cef["deviceLabel"] = BREACH_DEVICE_FIELDS(breach_devices)
         cef["incidentUrl"] = f"{base_url}/#aiagroup/{current_group}"
         return cef
 
@@ -0,0 +1,150 @@
+# Copyright (c) 2025-2026 Splunk Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# File: darktrace_cache.py
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+
+"""
+Cache of Darktrace API responses shared between action runs
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Optional
+
+
+class ResponseCache:
+    """
+    Cache of Darktrace API responses with a TTL per entry and LRU eviction.
+
+    Entries are kept in an SQLite database in the app state directory, so separate action
+    processes share them. The directory is shared by every asset of the app, so entries are
+    keyed by the Darktrace master they came from as well as the request. Any database error is treated as a cache miss, the cache never
+    fails an action. Hits and misses are counted for this run and in total.
+    """
+
+    def __init__(self, path: str, max_entries: int):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None  # type: Optional[sqlite3.Connection]
+        try:
+            self._conn = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        except sqlite3.Error:
+            self._conn = None
+
+    @staticmethod
+    def make_key(base_url: str, query_uri: str, params: Optional[dict]) -> str:
+        """Cache key of a request to a Darktrace master"""
+        return f"{base_url.rstrip('/')}{query_uri}?{json.dumps(params or {}, sort_keys=True, default=str)}"
+
+    def get(self, base_url: str, query_uri: str, params: Optional[dict]) -> tuple[bool, Any]:
+        """Look up a response. Returns a tuple of (hit, response)"""
+        key = self.make_key(base_url, query_uri, params)
+        current_time = time.time()
+        with self._lock:
+            try:
+                row = self._execute("SELECT value FROM responses WHERE key = ? AND expires > ?", (key, current_time)).fetchone()
+                if row is not None:
+                    self._execute("UPDATE responses SET accessed = ? WHERE key = ?", (current_time, key))
+            except sqlite3.Error:
+                row = None
+
+            if row is None:
+                self.misses += 1
+                return False, None
+            self.hits += 1
+        return True, json.loads(row[0])
+
+    def set(self, base_url: str, query_uri: str, params: Optional[dict], response: Any, ttl: int):
+        """Store a response for `ttl` seconds, evicting the least recently used entries above the size limit"""
+        key = self.make_key(base_url, query_uri, params)
+        current_time = time.time()
+        with self._lock:
+            try:
+                self._execute(
+                    "INSERT OR REPLACE INTO responses (key, value, expires, accessed) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(response), current_time + ttl, current_time),
+                )
+                self._execute("DELETE FROM responses WHERE expires <= ?", (current_time,))
+                self._execute(
+                    "DELETE FROM responses WHERE key NOT IN (SELECT key FROM responses ORDER BY accessed DESC LIMIT ?)",
+                    (self.max_entries,),
+                )
+            except sqlite3.Error:
+                pass
+
+    def invalidate(self, base_url: str, query_uri: str, params: Optional[dict]):
+        """Drop a cached response"""
+        with self._lock:
+            try:
+                self._execute("DELETE FROM responses WHERE key = ?", (self.make_key(base_url, query_uri, params),))
+            except sqlite3.Error:
+                pass
+
+    def stats(self) -> dict[str, Any]:
+        """Hit and miss counters for this run and in total"""
+        with self._lock:
+            try:
+                totals = dict(self._execute("SELECT name, value FROM counters").fetchall())
+            except sqlite3.Error:
+                totals = {}
+        total_hits = totals.get("hits", 0) + self.hits
+        total_misses = totals.get("misses", 0) + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / (self.hits + self.misses), 3) if self.hits + self.misses else 0.0,
+            "total_hits": total_hits,
+            "total_misses": total_misses,
+            "total_hit_rate": round(total_hits / (total_hits + total_misses), 3) if total_hits + total_misses else 0.0,
+        }
+
+    def close(self):
+        """Add the counters of this run to the totals and close the database"""
+        with self._lock:
+            if self._conn is None:
+                return
+            try:
+                for name, value in (("hits", self.hits), ("misses", self.misses)):
+                    self._execute(
+                        "INSERT INTO counters (name, value) VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                        (name, value),
+                    )
+                self._conn.close()
+            except sqlite3.Error:
+                pass
+            self._conn = None
+
+    def _execute(self, sql: str, parameters: tuple = ()) -> sqlite3.Cursor:
+        """Run a statement, raising sqlite3.Error if the database is unavailable"""
+        if self._conn is None:
+            raise sqlite3.OperationalError("Response cache is unavailable")
+        return self._conn.execute(sql, parameters)
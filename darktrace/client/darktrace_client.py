@@ -28,40 +28,95 @@
 Client for making requests to the Darktrace API
 """
 
-import hashlib
-import hmac
-import json
-from datetime import datetime
+import threading
+import time
+from collections.abc import Iterable, Iterator
+from datetime import datetime, timedelta
 from typing import TYPE_CHECKING, Optional, Union
 
+import phantom.app as phantom
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 
 if TYPE_CHECKING:
-    import phantom.app as phantom  # noqa: F401
     from phantom.action_result import ActionResult
 
 from ..darktrace_consts import (
     ACK_BREACH,
     AI_ANALYST_ENDPOINT,
+    CACHE_TTLS,
     COMMENT_BREACH,
+    CONNECT_RETRY_BACKOFF_FACTOR,
+    DEFAULT_CONNECT_RETRIES,
+    DEFAULT_MAX_CONCURRENT_REQUESTS,
+    DEFAULT_MAX_RETRIES,
+    DEFAULT_POOL_SIZE,
+    DEFAULT_RATE_LIMIT,
     DEVICE_SUMMARY_ENDPOINT,
     DEVICES_ENDPOINT,
+    MB_SLICE_INITIAL_MINUTES,
+    MB_SLICE_MAX_MINUTES,
+    MB_SLICE_MIN_MINUTES,
+    MB_SLICE_TARGET_SIZE,
+    MB_SLICE_TIMEOUT,
+    MB_STREAM_BATCH_SIZE,
     MODEL_BREACH_COMMENT_ENDPOINT,
     MODEL_BREACH_CONNECTIONS_ENDPOINT,
     MODEL_BREACH_ENDPOINT,
+    RATE_LIMIT_BURST,
+    REQUEST_TIMEOUT,
+    RETRY_BACKOFF_BASE,
+    RETRY_BACKOFF_MAX,
+    RETRY_DEFAULT_BUDGET,
+    RETRY_ENDPOINT_BUDGETS,
     TAG_ENTITIES_ENDPOINT,
     TEST_CONNECTIVITY_ENDPOINT,
     UNACK_BREACH,
 )
-from ..darktrace_utils import now, stringify_data
-from .darktrace_resp_processer import process_response
+from ..darktrace_metrics import EndpointTimings, PollMetrics
+from ..darktrace_utils import stringify_data
+from .darktrace_cache import ResponseCache
+from .darktrace_resp_processer import JSONArrayStream, process_response
+from .darktrace_retry import RetryPolicy, TokenBucket
+from .darktrace_signing import SigningContext
 
 
 if TYPE_CHECKING:
     from darktrace_connector import DarktraceConnector
 
 
+def create_session(
+    pool_size: int = DEFAULT_POOL_SIZE, connect_retries: int = DEFAULT_CONNECT_RETRIES, keep_alive: bool = True
+) -> requests.Session:
+    """
+    Create a pooled HTTP session for talking to the Darktrace API.
+
+    Only failures to connect are retried by the adapter, as a request that reached the
+    Darktrace master must not be replayed with the same signed headers.
+    """
+    retries = Retry(total=connect_retries, connect=connect_retries, read=0, status=0, backoff_factor=CONNECT_RETRY_BACKOFF_FACTOR)
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retries)
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if not keep_alive:
+        session.headers["Connection"] = "close"
+    return session
+
+
+def create_rate_limiter(rate: float = DEFAULT_RATE_LIMIT) -> TokenBucket:
+    """Create the client-side rate limiter for requests to the Darktrace API"""
+    return TokenBucket(rate, RATE_LIMIT_BURST)
+
+
+def create_retry_policy(max_retries: int = DEFAULT_MAX_RETRIES) -> RetryPolicy:
+    """Create the retry policy for requests to the Darktrace API"""
+    return RetryPolicy(max_retries, RETRY_BACKOFF_BASE, RETRY_BACKOFF_MAX, RETRY_ENDPOINT_BUDGETS, RETRY_DEFAULT_BUDGET)
+
+
 class DarktraceClient:
     """
     Client class to interact with the Darktrace API
@@ -76,13 +131,44 @@ class DarktraceClient:
             config["public_token"],
             config["private_token"],
             config["tls_verify"],
+            session=connector.session,
+            request_slots=connector.request_slots,
+            cache=connector.response_cache,
+            rate_limiter=connector.rate_limiter,
+            retry_policy=connector.retry_policy,
+            debug_responses=connector.debug_responses,
+            timings=connector.endpoint_timings,
         )
 
-    def __init__(self, base_url: str, token: str, private_token: str, use_tls_certificate: bool = True):
+    def __init__(
+        self,
+        base_url: str,
+        token: str,
+        private_token: str,
+        use_tls_certificate: bool = True,
+        session: Optional[requests.Session] = None,
+        request_slots: Optional[threading.Semaphore] = None,
+        cache: Optional[ResponseCache] = None,
+        rate_limiter: Optional[TokenBucket] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        debug_responses: bool = False,
+        metrics: Optional[PollMetrics] = None,
+        timings: Optional[EndpointTimings] = None,
+    ):
         self.base_url = base_url
-        self._token = token
-        self._private_token = private_token
+        self._signing = SigningContext(token, private_token)
         self._use_tsl_certificate = use_tls_certificate
+        self._session = session or create_session()
+        # Limits the number of requests in flight to the Darktrace master
+        self._request_slots = request_slots or threading.BoundedSemaphore(DEFAULT_MAX_CONCURRENT_REQUESTS)
+        self._cache = cache
+        self._rate_limiter = rate_limiter or create_rate_limiter()
+        self._retry_policy = retry_policy or create_retry_policy()
+        # Store every response in debug data, not only failed ones
+        self._debug_responses = debug_responses
+        # Time spent waiting for responses and streamed bytes are added to the metrics when set
+        self.metrics = metrics
+        self._timings = timings or EndpointTimings()
 
     def test_connectivity(self, action_result: "ActionResult") -> tuple[bool, dict]:
         """Call the summary statistics endpoint to test connecting to the Darktrace Box"""
@@ -90,27 +176,30 @@ class DarktraceClient:
 
     def get_device_summary(self, action_result: "ActionResult", device_id: int) -> tuple[bool, dict]:
         """Get a device summary"""
-        return self.get(action_result, DEVICE_SUMMARY_ENDPOINT, params={"did": device_id})  # type: ignore
+        return self.cached_get(action_result, DEVICE_SUMMARY_ENDPOINT, params={"did": device_id})  # type: ignore
 
     def get_tags_for_device(self, action_result: "ActionResult", device_id: int) -> tuple[bool, list[dict]]:
         """Get the tags on a device"""
-        return self.get(action_result, TAG_ENTITIES_ENDPOINT, params={"did": device_id})  # type: ignore
+        return self.cached_get(action_result, TAG_ENTITIES_ENDPOINT, params={"did": device_id})  # type: ignore
 
     def post_tag_to_device(self, action_result: "ActionResult", device_id: int, tag: str, duration: Optional[int] = None) -> tuple[bool, dict]:
         """Tag a device for a specified duration (or indefinitely if unspecified)"""
         data = {"did": device_id, "tag": tag}
         if duration:
             data["duration"] = duration
-        return self.post(action_result, TAG_ENTITIES_ENDPOINT, data, urlencoded=True)  # type: ignore
+        result = self.post(action_result, TAG_ENTITIES_ENDPOINT, data, urlencoded=True)
+        self._invalidate(DEVICE_SUMMARY_ENDPOINT, {"did": device_id})
+        self._invalidate(TAG_ENTITIES_ENDPOINT, {"did": device_id})
+        self._invalidate(TAG_ENTITIES_ENDPOINT, self._tagged_devices_params(tag))
+        return result  # type: ignore
 
     def get_tagged_devices(self, action_result: "ActionResult", tag: str) -> tuple[bool, dict[str, list[dict]]]:
         """Get devices with a specific tag"""
-        params = {"tag": tag, "fulldevicedetails": "true"}
-        return self.get(action_result, TAG_ENTITIES_ENDPOINT, params=params)  # type: ignore
+        return self.cached_get(action_result, TAG_ENTITIES_ENDPOINT, params=self._tagged_devices_params(tag))  # type: ignore
 
     def get_device(self, action_result: "ActionResult", device_id: int) -> tuple[bool, dict]:
         """Get Darktrace data about a device ID"""
-        return self.get(action_result, DEVICES_ENDPOINT, params={"did": device_id})  # type: ignore
+        return self.cached_get(action_result, DEVICES_ENDPOINT, params={"did": device_id})  # type: ignore
 
     def post_model_breach_comment(self, action_result: "ActionResult", model_breach_id: int, comment: str) -> tuple[bool, Optional[dict]]:
         """Post a comment on a model breach"""
@@ -131,11 +220,41 @@ class DarktraceClient:
         """Get comments on a model breach"""
         return self.get(action_result, MODEL_BREACH_COMMENT_ENDPOINT, params={"pbid": model_breach_id})  # type: ignore
 
-    def get_breach_connections(self, action_result: "ActionResult", model_breach_id: int) -> tuple[bool, Optional[list[dict]]]:
-        """Get connection data associated to a model breach"""
-        return self.get(action_result, MODEL_BREACH_CONNECTIONS_ENDPOINT, params={"pbid": model_breach_id})  # type: ignore
-
-    def get_model_breaches(self, action_result: "ActionResult", start_time: datetime, end_time: datetime) -> tuple[bool, Optional[list[dict]]]:
+    def get_breach_connections(
+        self,
+        action_result: "ActionResult",
+        model_breach_id: int,
+        stream: bool = False,
+        count: Optional[int] = None,
+        start_time: Optional[int] = None,
+        end_time: Optional[int] = None,
+        event_type: Optional[str] = None,
+    ) -> tuple[bool, Optional[Iterable[dict]]]:
+        """
+        Get connection data associated to a model breach.
+
+        The events can be limited to a `count`, a time window in epoch milliseconds and an event type by the Darktrace master.
+        """
+        params = {"pbid": model_breach_id}  # type: Dict[str, Any]
+        if count:
+            params["count"] = count
+        if start_time is not None:
+            params["starttime"] = start_time
+        if end_time is not None:
+            params["endtime"] = end_time
+        if event_type:
+            params["eventtype"] = event_type
+        return self.get(action_result, MODEL_BREACH_CONNECTIONS_ENDPOINT, params=params, stream=stream)  # type: ignore
+
+    def get_model_breaches(
+        self,
+        action_result: "ActionResult",
+        start_time: datetime,
+        end_time: datetime,
+        timeout: float = REQUEST_TIMEOUT,
+        retry_timeouts: bool = True,
+        stream: bool = False,
+    ) -> tuple[bool, Optional[Iterable[dict]]]:
         """Get model breach data in a time range"""
         params = {
             "from": start_time.strftime("%Y-%m-%dT%H:%M:%S.00Z"),
@@ -143,30 +262,136 @@ class DarktraceClient:
             "includeacknowledged": "true",
         }
         query_uri = f"{MODEL_BREACH_ENDPOINT}"
-        return self.get(action_result, query_uri, params)  # type: ignore
+        return self.get(action_result, query_uri, params, timeout=timeout, retry_timeouts=retry_timeouts, stream=stream)  # type: ignore
 
-    def get_ai_analyst_incidents(
+    def iter_model_breaches(
         self, action_result: "ActionResult", start_time: datetime, end_time: datetime
-    ) -> tuple[bool, Optional[list[dict]]]:
+    ) -> Iterator[tuple[bool, list[dict], datetime]]:
+        """
+        Get model breach data in a time range, one time slice at a time.
+
+        Each slice is streamed, and yielded as tuples of (status, model breaches, slice start) in batches
+        of up to MB_STREAM_BATCH_SIZE breaches, oldest slice first. Within a slice, breaches are in the
+        order the master returns them, which is not necessarily oldest first. Stops after yielding a
+        failed status. The span of the slices adapts to the breach rate: a slice that times out or drops
+        is requested again at half the span, a slice larger than the target size halves the span of the
+        next one, and small slices let it grow again. Breaches of a slice requested again may be yielded twice.
+        """
+        span = timedelta(minutes=MB_SLICE_INITIAL_MINUTES)
+        min_span = timedelta(minutes=MB_SLICE_MIN_MINUTES)
+        max_span = timedelta(minutes=MB_SLICE_MAX_MINUTES)
+
+        slice_start = start_time
+        while slice_start < end_time:
+            slice_end = min(slice_start + span, end_time)
+            try:
+                # A slice that times out is split rather than retried
+                action_status, model_breaches = self.get_model_breaches(
+                    action_result, slice_start, slice_end, timeout=MB_SLICE_TIMEOUT, retry_timeouts=False, stream=True
+                )
+            except requests.Timeout as excep:
+                if span <= min_span:
+                    message = f"Timed out retrieving model breaches between {slice_start} and {slice_end}"
+                    yield action_result.set_status(phantom.APP_ERROR, message, exception=excep), [], slice_start
+                    return
+                span = max(span / 2, min_span)
+                continue
+
+            if phantom.is_fail(action_status):
+                yield action_status, [], slice_start
+                return
+
+            slice_size = 0
+            batch = []
+            for model_breach in model_breaches or []:
+                slice_size += 1
+                batch.append(model_breach)
+                if len(batch) >= MB_STREAM_BATCH_SIZE:
+                    yield action_status, batch, slice_start
+                    batch = []
+
+            if isinstance(model_breaches, JSONArrayStream) and model_breaches.failed:
+                if isinstance(model_breaches.error, requests.RequestException) and span > min_span:
+                    span = max(span / 2, min_span)
+                    continue
+                yield phantom.APP_ERROR, batch, slice_start
+                return
+
+            if batch:
+                yield action_status, batch, slice_start
+            slice_start = slice_end
+
+            if slice_size > MB_SLICE_TARGET_SIZE:
+                span = max(span / 2, min_span)
+            elif slice_size < MB_SLICE_TARGET_SIZE // 4:
+                span = min(span * 2, max_span)
+
+    def get_ai_analyst_incidents(
+        self, action_result: "ActionResult", start_time: datetime, end_time: datetime, stream: bool = False
+    ) -> tuple[bool, Optional[Iterable[dict]]]:
         """Get AI Analyst incident data in a time range"""
         params = {
             "starttime": int(start_time.timestamp() * 1000),
             "endtime": int(end_time.timestamp() * 1000),
             "includeacknowledged": "true",
         }
-        return self.get(action_result, AI_ANALYST_ENDPOINT, params=params)  # type: ignore
+        return self.get(action_result, AI_ANALYST_ENDPOINT, params=params, stream=stream)  # type: ignore
 
     def post(
         self, action_result: "ActionResult", query_uri: str, data: Optional[dict] = None, json: Optional[dict] = None, urlencoded: bool = False
     ) -> tuple[bool, Optional[Union[dict, list[dict]]]]:
         """Make an HTTP POST request to the Darktrace API"""
-        return process_response(self._request(query_uri, method="POST", data=data, json=json, urlencoded=urlencoded), action_result)
+        return process_response(
+            self._request(query_uri, method="POST", data=data, json=json, urlencoded=urlencoded), action_result, debug=self._debug_responses
+        )
 
     def get(
+        self,
+        action_result: "ActionResult",
+        query_uri: str,
+        params: Optional[dict] = None,
+        timeout: float = REQUEST_TIMEOUT,
+        retry_timeouts: bool = True,
+        stream: bool = False,
+    ) -> tuple[bool, Optional[Union[dict, list[dict], JSONArrayStream]]]:
+        """
+        Make an HTTP GET request to the Darktrace API.
+
+        With `stream`, a JSON array response is returned as a JSONArrayStream, decoded as it is iterated.
+        """
+        return process_response(
+            self._request(query_uri, "GET", params=params, timeout=timeout, retry_timeouts=retry_timeouts, stream=stream),
+            action_result,
+            debug=self._debug_responses,
+            stream=stream,
+            metrics=self.metrics,
+        )
+
+    def cached_get(
         self, action_result: "ActionResult", query_uri: str, params: Optional[dict] = None
     ) -> tuple[bool, Optional[Union[dict, list[dict]]]]:
-        """Make an HTTP GET request to the Darktrace API"""
-        return process_response(self._request(query_uri, "GET", params=params), action_result)
+        """Make an HTTP GET request to the Darktrace API, answering from the response cache when possible"""
+        if self._cache is None:
+            return self.get(action_result, query_uri, params)
+
+        hit, cached = self._cache.get(self.base_url, query_uri, params)
+        if hit:
+            return phantom.APP_SUCCESS, cached
+
+        action_status, result = self.get(action_result, query_uri, params)
+        if phantom.is_success(action_status):
+            self._cache.set(self.base_url, query_uri, params, result, CACHE_TTLS[query_uri])
+        return action_status, result
+
+    def _invalidate(self, query_uri: str, params: dict):
+        """Drop a cached response after a write that changes it"""
+        if self._cache is not None:
+            self._cache.invalidate(self.base_url, query_uri, params)
+
+    @staticmethod
+    def _tagged_devices_params(tag: str) -> dict[str, str]:
+        """Query parameters to get the devices with a tag"""
+        return {"tag": tag, "fulldevicedetails": "true"}
 
     def _request(
         self,
@@ -177,59 +402,66 @@ class DarktraceClient:
         json: Optional[dict] = None,
         headers: Optional[dict[str, str]] = None,
         urlencoded: bool = False,
+        timeout: float = REQUEST_TIMEOUT,
+        retry_timeouts: bool = True,
+        stream: bool = False,
     ) -> requests.Response:
-        """Make an HTTP request to the Darktrace API"""
+        """
+        Make an HTTP request to the Darktrace API.
 
-        url = f"{self.base_url}{query_uri}"
-        headers = {
-            **self._create_headers(query_uri, params or data or json or None, urlencoded=urlencoded, is_json=bool(json)),
-            **(headers or {}),
-        }
+        Requests are rate limited, and retried as decided by the retry policy. The signed headers
+        embed the request date, so they are created again for every attempt from the same query string.
+        """
 
-        TIMEOUT = 10
+        url = f"{self.base_url}{query_uri}"
 
+        # The query string is encoded once, and a url-encoded body is sent as the same string that is signed
+        query_data = params or data or json or None
+        query_string = self._signing.query_string(query_data, is_json=bool(json))
         if urlencoded:
-            request_data = stringify_data(data)
+            request_data = query_string if query_data is data else stringify_data(data)
         else:
             request_data = data
 
-        return requests.request(
-            method=method,
-            url=url,
-            params=params,
-            data=request_data,
-            json=json,
-            headers=headers,
-            verify=self._use_tsl_certificate,
-            timeout=TIMEOUT,
-        )
-
-    def _create_headers(
-        self, query_uri: str, query_data: Optional[dict] = None, urlencoded: bool = False, is_json: bool = False
-    ) -> dict[str, str]:
-        """Create headers required for successful authentication"""
-        date = now().isoformat(timespec="auto")
-        signature = self._create_signature(query_uri, date, query_data, is_json=is_json)
-
-        if not urlencoded:
-            return {"DTAPI-Token": self._token, "DTAPI-Date": date, "DTAPI-Signature": signature}
-        else:
-            return {
-                "DTAPI-Token": self._token,
-                "DTAPI-Date": date,
-                "DTAPI-Signature": signature,
-                "Content-Type": "application/x-www-form-urlencoded; charset=UTF-8",
-            }
-
-    def _create_signature(self, query_uri: str, date: str, query_data: Optional[dict] = None, is_json: bool = False) -> str:
-        """Create signature from Darktrace private token"""
-        if is_json:
-            query_string = f"?{json.dumps(query_data)}"
-        else:
-            query_string = f"?{stringify_data(query_data)}" if query_data else ""
-
-        return hmac.new(
-            self._private_token.encode("ASCII"),
-            f"{query_uri}{query_string}\n{self._token}\n{date}".encode("ASCII"),
-            hashlib.sha1,
-        ).hexdigest()
+        attempt = 0
+        while True:
+            request_headers = {**self._signing.headers(query_uri, query_string, urlencoded=urlencoded), **(headers or {})}
+
+            self._rate_limiter.acquire()
+            request_start = time.perf_counter()
+            try:
+                with self._request_slots:
+                    response = self._session.request(
+                        method=method,
+                        url=url,
+                        params=params,
+                        data=request_data,
+                        json=json,
+                        headers=request_headers,
+                        verify=self._use_tsl_certificate,
+                        timeout=timeout,
+                        stream=stream,
+                    )
+            except (requests.Timeout, requests.ConnectionError) as excep:
+                self._add_request_time(query_uri, request_start)
+                if isinstance(excep, requests.Timeout) and not retry_timeouts:
+                    raise
+                if not self._retry_policy.should_retry(query_uri, method, attempt, exception=excep):
+                    raise
+                delay = self._retry_policy.delay(attempt)
+            else:
+                self._add_request_time(query_uri, request_start)
+                if not self._retry_policy.should_retry(query_uri, method, attempt, response=response):
+                    return response
+                delay = self._retry_policy.delay(attempt, response)
+                response.close()
+
+            time.sleep(delay)
+            attempt += 1
+
+    def _add_request_time(self, query_uri: str, request_start: float):
+        """Add the time since a request was sent to the endpoint timings, and to the fetch phase of the metrics"""
+        seconds = time.perf_counter() - request_start
+        self._timings.add(RetryPolicy.endpoint(query_uri), seconds)
+        if self.metrics is not None:
+            self.metrics.add_time("fetch", seconds)
@@ -24,118 +24,110 @@
 # either express or implied. See the License for the specific language governing permissions
 # and limitations under the License.
 
-from dataclasses import dataclass
+from collections.abc import Iterable
 from datetime import datetime, timedelta
 from typing import Any
 
-from ..darktrace_utils import SplunkSeverity, description_cleanup, get_device_name, nget
+from ..darktrace_utils import NPaths, SplunkSeverity, description_cleanup, get_device_name, npath
 
 
-@dataclass
-class ModelBreachContainer:
-    """
-    Dataclass to store the data for a Container from a Model Breach Event
-    """
+MODEL_BREACH_TIME_FORMAT = "%Y-%m-%dT%H:%M:%S.00Z"
 
-    name: str
-    description: str
-    start_time: str
-    severity: str
-    source_data_identifier: str
-    asset_name: str
-    score: str
-
-    def __init__(self, model_breach: dict[str, Any]) -> None:
-        time = model_breach["time"] / 1000
-        time_formatted = datetime.fromtimestamp(time).strftime("%Y-%m-%dT%H:%M:%S.00Z")
-        score = round(model_breach["score"] * 100)
+MODEL_BREACH_FIELDS = NPaths(
+    ("model", "then", "category"),
+    ("model", "then", "compliance"),
+    ("model", "then", "name"),
+    ("model", "then", "description"),
+    ("device", "did"),
+    ("device", "hostname"),
+    ("device", "devicelabel"),
+    ("device", "ip"),
+)
+MODEL_BREACH_ANTIGENA = npath("model", "now", "actions", "antigena")
 
-        severity = nget(model_breach, "model", "then", "category")
-        is_compliance = nget(model_breach, "model", "then", "compliance")
 
-        if is_compliance or severity:
-            self.severity = SplunkSeverity.from_category("Compliance" if is_compliance else severity).value
-        else:
-            self.severity = SplunkSeverity.from_score(score).value
+class ModelBreachBuilder:
+    """
+    Builds the container and artifact dicts of many model breaches, ready to save.
 
-        pbid = model_breach.get("pbid")
-        category = nget(model_breach, "model", "then", "name")
-        did = nget(model_breach, "device", "did")
-        hostname = nget(model_breach, "device", "hostname")
-        devicelabel = nget(model_breach, "device", "devicelabel")
-        ip = nget(model_breach, "device", "ip")
-        device_name = get_device_name(devicelabel, hostname, ip, category)
+    The dicts are built directly: the fields of a breach are extracted in one walk and
+    formatted times are cached per second across breaches.
+    """
 
-        self.name = f"{device_name} breached model {category} with a score of {score}%"
-        self.description = f"{device_name} ({did}) breached model {category} ({pbid}) with a score of {score}%"
+    def __init__(self, base_url: str):
+        self.base_url = base_url
+        self._formatted_times = {}  # type: Dict[Any, str]
 
-        self.start_time = time_formatted
-        self.source_data_identifier = pbid
-        self.asset_name = "Darktrace"
-        self.score = str(score)
+    def build_batch(self, model_breaches: Iterable[dict[str, Any]], container_id: str = "") -> list[tuple[dict[str, Any], dict[str, Any]]]:
+        """Build a tuple of (container, artifact) for every model breach"""
+        return [self.build(model_breach, container_id) for model_breach in model_breaches]
 
+    def build(self, model_breach: dict[str, Any], container_id: str = "") -> tuple[dict[str, Any], dict[str, Any]]:
+        """Build the container and artifact of a model breach"""
 
-@dataclass
-class ModelBreachArtifact:
-    """
-    Dataclass to store the data for an Artifact created from a model breach
-    """
+        category, is_compliance, model_name, description, did, hostname, devicelabel, ip = MODEL_BREACH_FIELDS(model_breach)
+
+        score = round(model_breach["score"] * 100)
+        if is_compliance or category:
+            severity = SplunkSeverity.from_category("Compliance" if is_compliance else category).value
+        else:
+            severity = SplunkSeverity.from_score(score).value
 
-    asset_name: str
-    container_id: str
-    name: str
-    device_label: str
-    type: str
-    start_time: str
-    severity: str
-    source_data_identifier: str
-    description: str
-    cef: dict
-
-    def __init__(
-        self,
-        model_breach_container: ModelBreachContainer,
-        model_breach: dict[str, Any],
-        container_id: str,
-        base_url: str,
-    ):
-        description = nget(model_breach, "model", "then", "description")
-        self.description = description_cleanup(description)
-
-        category = nget(model_breach, "model", "then", "name")
-        category_list = category.split("::")
-
-        self.asset_name = model_breach_container.asset_name
-        self.container_id = str(container_id)
-        self.name = " / ".join(category_list[1:])
-        self.device_label = nget(model_breach, "device", "devicelabel")
-        self.type = category_list[0]
-        self.start_time = model_breach_container.start_time
-        self.severity = model_breach_container.severity
-        self.source_data_identifier = model_breach_container.source_data_identifier
-
-        self.cef = self.get_cef(model_breach, base_url)
-
-    def get_cef(self, model_breach: dict[str, Any], base_url) -> dict[str, Any]:
-        """Create the CEF (Common Event Format) object for a model breach artifact"""
-
-        cef = dict()
-        cef["modelBreachId"] = self.source_data_identifier
-        cef["modelBreachUrl"] = f"{base_url}/#modelbreach/{self.source_data_identifier!s}"
-
-        if "System" != self.type:
-            cef["deviceId"] = nget(model_breach, "device", "did")
-            cef["deviceAddress"] = nget(model_breach, "device", "ip")
-            cef["deviceHostname"] = nget(model_breach, "device", "hostname")
-            cef["deviceLabel"] = nget(model_breach, "device", "devicelabel")
+        pbid = model_breach.get("pbid")
+        device_name = get_device_name(devicelabel, hostname, ip, model_name)
+        start_time = self._format_time(model_breach["time"])
+
+        container = {
+            "name": f"{device_name} breached model {model_name} with a score of {score}%",
+            "description": f"{device_name} ({did}) breached model {model_name} ({pbid}) with a score of {score}%",
+            "start_time": start_time,
+            "severity": severity,
+            "source_data_identifier": pbid,
+            "asset_name": "Darktrace",
+            "score": str(score),
+        }
+
+        category_list = model_name.split("::")
+        artifact_type = category_list[0]
+        cef = {
+            "modelBreachId": pbid,
+            "modelBreachUrl": f"{self.base_url}/#modelbreach/{pbid!s}",
+        }  # type: Dict[str, Any]
+        if "System" != artifact_type:
+            cef["deviceId"] = did
+            cef["deviceAddress"] = ip
+            cef["deviceHostname"] = hostname
+            cef["deviceLabel"] = devicelabel
         else:
             cef["systemNote"] = "Login to the Darktrace UI to see the system alerts"
 
-        if "Antigena" in self.type:
-            antigena = nget(model_breach, "model", "now", "actions", "antigena")
+        if "Antigena" in artifact_type:
+            antigena = MODEL_BREACH_ANTIGENA(model_breach)
             if antigena is not None:
                 cef["antigenaAction"] = antigena.get("action")
                 cef["antigenaDuration"] = str(timedelta(seconds=antigena.get("duration")))
                 cef["antigenaNote"] = "Use the post tag action to trigger antigena actions for deployments in human confirmation mode"
 
-        return cef
+        artifact = {
+            "asset_name": "Darktrace",
+            "container_id": str(container_id),
+            "name": " / ".join(category_list[1:]),
+            "device_label": devicelabel,
+            "type": artifact_type,
+            "start_time": start_time,
+            "severity": severity,
+            "source_data_identifier": pbid,
+            "description": description_cleanup(description),
+            "cef": cef,
+        }
+
+        return container, artifact
+
+    def _format_time(self, time_ms: Any) -> str:
+        """Format a model breach time in milliseconds, cached per second"""
+        seconds = time_ms // 1000
+        formatted = self._formatted_times.get(seconds)
+        if formatted is None:
+            formatted = datetime.fromtimestamp(seconds).strftime(MODEL_BREACH_TIME_FORMAT)
+            self._formatted_times[seconds] = formatted
+        return formatted
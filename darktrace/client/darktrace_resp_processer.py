@@ -28,6 +28,10 @@
 Functions to process a response from the Darktrace API
 """
 
+import codecs
+import json
+import time
+from collections.abc import Iterator
 from typing import Any, Optional, Union
 
 import phantom.app as phantom
@@ -35,6 +39,156 @@ import requests
 from bs4 import BeautifulSoup
 from phantom.action_result import ActionResult
 
+from ..darktrace_consts import MAX_DEBUG_BODY_BYTES, STREAM_CHUNK_SIZE
+from ..darktrace_metrics import PollMetrics
+
+
+try:
+    # Faster decoder for streamed responses, used when installed
+    from simplejson import JSONDecoder
+except ImportError:
+    from json import JSONDecoder
+
+
+JSON_WHITESPACE = " \t\n\r"
+
+
+class JSONArrayStream:
+    """
+    Items of a top-level JSON array response, decoded incrementally as the body is downloaded.
+
+    Only the item being decoded and the items not yet consumed are held in memory, never the
+    whole body. Iteration stops early if the body cannot be decoded, has data after the array
+    or the download fails, in which case `failed` is set, `error` holds the exception and the
+    action result is set to an error.
+
+    The bytes read, the time spent waiting for the body and the time spent decoding it are
+    tracked, and added to `metrics` when given once iteration stops.
+    """
+
+    def __init__(
+        self,
+        resp: requests.Response,
+        action_result: ActionResult,
+        chunk_size: int = STREAM_CHUNK_SIZE,
+        metrics: Optional[PollMetrics] = None,
+    ):
+        self._resp = resp
+        self._action_result = action_result
+        self._chunk_size = chunk_size
+        self._metrics = metrics
+        self.count = 0
+        self.failed = False
+        self.error = None  # type: Optional[Exception]
+        self.bytes_read = 0
+        self.read_seconds = 0.0
+        self.decode_seconds = 0.0
+
+    def __iter__(self) -> Iterator[Any]:
+        try:
+            for item in self._decode():
+                self.count += 1
+                yield item
+        except (ValueError, requests.RequestException) as excep:
+            self.failed = True
+            self.error = excep
+            message = "Unable to parse JSON response." if isinstance(excep, ValueError) else "Failed reading response from server."
+            self._action_result.set_status(phantom.APP_ERROR, message, exception=excep)
+        finally:
+            self._resp.close()
+            if self._metrics is not None:
+                self._metrics.add_time("fetch", self.read_seconds)
+                self._metrics.add_time("parse", self.decode_seconds)
+                self._metrics.count("bytes_fetched", self.bytes_read)
+                self._metrics.count("items_parsed", self.count)
+
+    def _decode(self) -> Iterator[Any]:
+        """Decode the array items from the response chunks"""
+        decoder = JSONDecoder()
+        text_decoder = codecs.getincrementaldecoder(self._resp.encoding or "utf-8")(errors="strict")
+        chunks = self._resp.iter_content(chunk_size=self._chunk_size)
+        buffer = ""
+        position = 0
+        finished = False
+        # Number of characters to have buffered before decoding the next item is retried
+        needed = 0
+
+        def fill() -> bool:
+            """Read the next chunk into the buffer. Returns False once the body is exhausted"""
+            nonlocal buffer, position, finished
+            if finished:
+                return False
+            read_start = time.perf_counter()
+            chunk = next(chunks, None)
+            decode_start = time.perf_counter()
+            self.read_seconds += decode_start - read_start
+            if chunk is None:
+                buffer = buffer[position:] + text_decoder.decode(b"", final=True)
+                finished = True
+            else:
+                self.bytes_read += len(chunk)
+                buffer = buffer[position:] + text_decoder.decode(chunk)
+            position = 0
+            self.decode_seconds += time.perf_counter() - decode_start
+            return True
+
+        def next_token() -> str:
+            """Skip whitespace and return the next character without consuming it, or an empty string at the end"""
+            nonlocal position
+            while True:
+                while position < len(buffer) and buffer[position] in JSON_WHITESPACE:
+                    position += 1
+                if position < len(buffer) or not fill():
+                    return buffer[position : position + 1]
+
+        def check_end():
+            """Check that nothing but whitespace follows the array"""
+            if next_token():
+                raise ValueError("Unexpected data after JSON array")
+
+        if next_token() != "[":
+            raise ValueError("Expected a JSON array")
+        position += 1
+
+        if next_token() == "]":
+            position += 1
+            check_end()
+            return
+
+        while True:
+            next_token()
+            while len(buffer) - position < needed or position >= len(buffer):
+                if not fill():
+                    break
+            decode_start = time.perf_counter()
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+                # Only accept an item once its separator is buffered, so a number cut off by a chunk boundary is never decoded
+                following = end
+                while following < len(buffer) and buffer[following] in JSON_WHITESPACE:
+                    following += 1
+                if not finished and (following >= len(buffer) or buffer[following] not in ",]"):
+                    raise ValueError("Incomplete item")
+            except ValueError:
+                if finished:
+                    raise
+                # Wait until the buffer has doubled before decoding again, so large items are not decoded over and over
+                needed = max(2 * (len(buffer) - position), self._chunk_size)
+                continue
+            finally:
+                self.decode_seconds += time.perf_counter() - decode_start
+            needed = 0
+            position = end
+            yield item
+
+            separator = next_token()
+            position += 1
+            if separator == "]":
+                check_end()
+                return
+            if separator != ",":
+                raise ValueError(f"Expected ',' or ']' in JSON array, found {separator!r}")
+
 
 def _process_empty_response(response: requests.Response, action_result: ActionResult) -> tuple[bool, Optional[dict]]:
     """Handler for an empty response. Always errors as never expected."""
@@ -74,8 +228,9 @@ def _process_json_response(resp: requests.Response, action_result: ActionResult)
     """
 
     try:
-        resp_json = resp.json()
-    except requests.JSONDecodeError as excep:
+        # Decode straight from the raw bytes rather than from a decoded copy of the body
+        resp_json = json.loads(resp.content)
+    except ValueError as excep:
         return (
             action_result.set_status(phantom.APP_ERROR, "Unable to parse JSON response.", exception=excep),
             None,
@@ -92,18 +247,26 @@ def _process_json_response(resp: requests.Response, action_result: ActionResult)
     return (action_result.set_status(phantom.APP_ERROR, message), None)
 
 
-def process_response(resp: requests.Response, action_result: ActionResult) -> tuple[bool, Optional[Union[dict, list[dict]]]]:
-    """
-    Process a response from the Darktrace API. Only returns a success for JSON responses or empty 200 responses
-    """
+def _response_preview(resp: requests.Response) -> str:
+    """Body of a response for debug data, truncated to MAX_DEBUG_BODY_BYTES"""
+    body = resp.content or b""
+    preview = body[:MAX_DEBUG_BODY_BYTES].decode(resp.encoding or "utf-8", errors="replace")
+    if len(body) > MAX_DEBUG_BODY_BYTES:
+        preview += f"... [truncated {len(body) - MAX_DEBUG_BODY_BYTES} bytes]"
+    return preview
+
 
-    # store the r_text in debug data, it will get dumped in the logs if the
-    # action fails
+def _add_debug_data(resp: requests.Response, action_result: ActionResult):
+    """Store the response in debug data, it will get dumped in the logs if the action fails"""
     if hasattr(action_result, "add_debug_data"):
         action_result.add_debug_data({"r_status_code": resp.status_code})
-        action_result.add_debug_data({"r_text": resp.text})
+        action_result.add_debug_data({"r_text": _response_preview(resp)})
         action_result.add_debug_data({"r_headers": resp.headers})
 
+
+def _process_response(resp: requests.Response, action_result: ActionResult) -> tuple[bool, Optional[Union[dict, list[dict]]]]:
+    """Process a response by its content type"""
+
     # Process a json response
     if "json" in resp.headers.get("Content-Type", ""):
         return _process_json_response(resp, action_result)
@@ -113,7 +276,7 @@ def process_response(resp: requests.Response, action_result: ActionResult) -> tu
         return _process_html_response(resp, action_result)
 
     # Handle an empty response
-    if not resp.text:
+    if not resp.content:
         return _process_empty_response(resp, action_result)
 
     # everything else is an error at this point
@@ -124,3 +287,37 @@ def process_response(resp: requests.Response, action_result: ActionResult) -> tu
     )
 
     return (action_result.set_status(phantom.APP_ERROR, message), None)
+
+
+def process_response(
+    resp: requests.Response,
+    action_result: ActionResult,
+    debug: bool = False,
+    stream: bool = False,
+    metrics: Optional[PollMetrics] = None,
+) -> tuple[bool, Optional[Union[dict, list[dict], JSONArrayStream]]]:
+    """
+    Process a response from the Darktrace API. Only returns a success for JSON responses or empty 200 responses
+
+    The response is only stored in debug data when processing fails, or for every response if `debug` is set.
+    Bodies in debug data are truncated, large successful responses are never copied.
+
+    With `stream`, a successful JSON response is returned as a JSONArrayStream of its items instead of being decoded.
+    The request must have been made with `stream=True`. The stream adds its download and decoding to `metrics` when given.
+    """
+
+    if stream and 200 <= resp.status_code < 399 and "json" in resp.headers.get("Content-Type", ""):
+        if debug and hasattr(action_result, "add_debug_data"):
+            action_result.add_debug_data({"r_status_code": resp.status_code})
+            action_result.add_debug_data({"r_headers": resp.headers})
+        return phantom.APP_SUCCESS, JSONArrayStream(resp, action_result, metrics=metrics)
+
+    if debug:
+        _add_debug_data(resp, action_result)
+
+    action_status, result = _process_response(resp, action_result)
+
+    if phantom.is_fail(action_status) and not debug:
+        _add_debug_data(resp, action_result)
+
+    return action_status, result
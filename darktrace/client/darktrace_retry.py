@@ -0,0 +1,156 @@
+# Copyright (c) 2025-2026 Splunk Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# File: darktrace_retry.py
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+
+"""
+Client-side rate limiting and retries for requests to the Darktrace API
+"""
+
+import random
+import threading
+import time
+from collections import defaultdict
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+import requests
+
+
+class TokenBucket:
+    """
+    Rate limiter allowing `rate` requests per second on average, in bursts of up to `capacity`.
+
+    A rate of 0 disables the limit.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = max(capacity, 1)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Wait until a request may be sent"""
+        if self.rate <= 0:
+            return
+
+        while True:
+            with self._lock:
+                current_time = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (current_time - self._updated) * self.rate)
+                self._updated = current_time
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class RetryPolicy:
+    """
+    Decides whether a failed request is retried and how long to wait first.
+
+    Rate limited and unavailable responses are retried for every method, as the master did not act
+    on them. Timeouts and dropped connections are only retried for GET requests. Waits follow the
+    `Retry-After` header when there is one, and exponential backoff with full jitter otherwise.
+    Every endpoint has a retry budget for the lifetime of the policy, so one failing endpoint
+    cannot keep an action retrying.
+    """
+
+    RETRY_STATUSES = frozenset({429, 502, 503, 504})
+    NOT_PROCESSED_STATUSES = frozenset({429, 503})
+
+    def __init__(self, max_retries: int, backoff_base: float, backoff_max: float, endpoint_budgets: dict[str, int], default_budget: int):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.endpoint_budgets = endpoint_budgets
+        self.default_budget = default_budget
+        self.retries = 0
+        self._spent = defaultdict(int)  # type: DefaultDict[str, int]
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def endpoint(query_uri: str) -> str:
+        """Endpoint a query URI belongs to, the path up to the first ID, e.g. `/modelbreaches` for `/modelbreaches/1/acknowledge`"""
+        segments = []
+        for segment in query_uri.split("?", 1)[0].strip("/").split("/"):
+            if segment.isdigit():
+                break
+            segments.append(segment)
+        return "/" + "/".join(segments)
+
+    def should_retry(
+        self,
+        query_uri: str,
+        method: str,
+        attempt: int,
+        response: Optional[requests.Response] = None,
+        exception: Optional[Exception] = None,
+    ) -> bool:
+        """Whether to retry after an attempt, spending from the endpoint budget if so"""
+        if attempt >= self.max_retries:
+            return False
+
+        if response is not None:
+            statuses = self.RETRY_STATUSES if method == "GET" else self.NOT_PROCESSED_STATUSES
+            retryable = response.status_code in statuses
+        else:
+            retryable = method == "GET" and isinstance(exception, (requests.Timeout, requests.ConnectionError))
+
+        if not retryable:
+            return False
+
+        endpoint = self.endpoint(query_uri)
+        with self._lock:
+            if self._spent[endpoint] >= self.endpoint_budgets.get(endpoint, self.default_budget):
+                return False
+            self._spent[endpoint] += 1
+            self.retries += 1
+        return True
+
+    def delay(self, attempt: int, response: Optional[requests.Response] = None) -> float:
+        """Seconds to wait before the next attempt"""
+        retry_after = self._retry_after(response)
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+
+    @staticmethod
+    def _retry_after(response: Optional[requests.Response]) -> Optional[float]:
+        """Parse a `Retry-After` header given in seconds or as an HTTP date"""
+        if response is None or not response.headers.get("Retry-After"):
+            return None
+
+        value = response.headers["Retry-After"]
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            pass
+        try:
+            return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+        except (TypeError, ValueError):
+            return None
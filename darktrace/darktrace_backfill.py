@@ -0,0 +1,125 @@
+# Copyright (c) 2025-2026 Splunk Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# File: darktrace_backfill.py
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+
+"""
+Progress of a backfill of historical model breaches, persisted in connector state
+"""
+
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+from .darktrace_utils import POLL_TIME_FORMAT, parse_poll_time
+
+
+BACKFILL_OLDEST_FIRST = "oldest first"
+BACKFILL_NEWEST_FIRST = "newest first"
+BACKFILL_ORDERS = (BACKFILL_NEWEST_FIRST, BACKFILL_OLDEST_FIRST)
+
+
+class BackfillProgress:
+    """
+    Progress of a backfill over a fixed time range, walked in chunks oldest or newest first.
+
+    The cursor is the edge of the part of the range that is still to be ingested: the start of
+    the next chunk when walking oldest first, its end when walking newest first. The range is
+    identified by its configured start, end and order, and the backfill starts over whenever one
+    of them changes. A range without a configured end ends when its backfill first started.
+    """
+
+    VERSION = 1
+
+    def __init__(self, start: datetime, end: datetime, order: str, configured_end: Optional[datetime] = None):
+        self.start = start
+        self.end = end
+        self.order = order
+        self.configured_end = configured_end
+        self.cursor = start if order == BACKFILL_OLDEST_FIRST else end
+        self.ingested = 0
+
+    @classmethod
+    def from_state(
+        cls, serialized: Optional[dict[str, Any]], start: datetime, configured_end: Optional[datetime], order: str, started_at: datetime
+    ) -> "BackfillProgress":
+        """Resume the backfill of a range from connector state, starting it over if the state is for a different range"""
+        fresh = cls(start, configured_end or started_at, order, configured_end)
+        if not serialized or serialized.get("v") != cls.VERSION:
+            return fresh
+        if serialized.get("range") != fresh._range_key():
+            return fresh
+
+        end = parse_poll_time(serialized.get("end"))
+        cursor = parse_poll_time(serialized.get("cursor"))
+        if end is None or cursor is None:
+            return fresh
+        progress = cls(start, end, order, configured_end)
+        progress.cursor = min(max(cursor, start), end)
+        progress.ingested = serialized.get("ingested", 0)
+        return progress
+
+    @property
+    def done(self) -> bool:
+        """Whether the whole range has been ingested"""
+        if self.order == BACKFILL_OLDEST_FIRST:
+            return self.cursor >= self.end
+        return self.cursor <= self.start
+
+    def next_chunk(self, chunk_span: timedelta) -> tuple[datetime, datetime]:
+        """The time range of the next chunk, as a tuple of (start, end)"""
+        if self.order == BACKFILL_OLDEST_FIRST:
+            return self.cursor, min(self.cursor + chunk_span, self.end)
+        return max(self.cursor - chunk_span, self.start), self.cursor
+
+    def advance(self, chunk: tuple[datetime, datetime], ingested: int):
+        """Move the cursor past a chunk that has been ingested"""
+        chunk_start, chunk_end = chunk
+        self.cursor = chunk_end if self.order == BACKFILL_OLDEST_FIRST else chunk_start
+        self.ingested += ingested
+
+    def advance_within(self, chunk: tuple[datetime, datetime], resume_time: datetime, ingested: int):
+        """
+        Move the cursor into a chunk that was cut short, given the time its ingest stopped at. The chunk is
+        fetched oldest first, so everything before `resume_time` was ingested: an oldest first backfill
+        resumes there, while a newest first one cannot skip the rest of the chunk and keeps its cursor.
+        """
+        chunk_start, chunk_end = chunk
+        if self.order == BACKFILL_OLDEST_FIRST:
+            self.cursor = min(max(resume_time, chunk_start), chunk_end)
+        self.ingested += ingested
+
+    def to_state(self) -> dict[str, Any]:
+        """Serialize the progress for connector state"""
+        return {
+            "v": self.VERSION,
+            "range": self._range_key(),
+            "end": self.end.strftime(POLL_TIME_FORMAT),
+            "cursor": self.cursor.strftime(POLL_TIME_FORMAT),
+            "ingested": self.ingested,
+        }
+
+    def _range_key(self) -> list[Optional[str]]:
+        """The configured start, end and order identifying the range"""
+        configured_end = self.configured_end.strftime(POLL_TIME_FORMAT) if self.configured_end else None
+        return [self.start.strftime(POLL_TIME_FORMAT), configured_end, self.order]
@@ -37,3 +37,89 @@ MODEL_BREACH_COMMENT_ENDPOINT = "/mbcomments"
 DEVICES_ENDPOINT = "/devices"
 DEVICE_SUMMARY_ENDPOINT = "/devicesummary"
 AI_ANALYST_ENDPOINT = "/aianalyst/incidentevents"
+
+# Poll defaults
+DEFAULT_POLL_OVERLAP_MINUTES = 5
+DEFAULT_MB_FIRST_RUN_LOOKBACK_HOURS = 6
+DEFAULT_AIA_FIRST_RUN_LOOKBACK_HOURS = 24
+DEFAULT_MAX_CATCHUP_HOURS = 24
+
+DEFAULT_DEDUP_RETENTION_HOURS = 72
+DEDUP_MAX_ENTRIES = 100000
+DEFAULT_ARTIFACT_BATCH_SIZE = 100
+DEFAULT_POLL_MAX_SECONDS = 900
+DEFAULT_POLL_MAX_ITEMS = 10000
+POLL_FETCH_WORKERS = 2
+POLL_PREFETCH_SLICES = 2
+# Share of the poll budget model breaches may use while AI Analyst incidents are also polled
+POLL_MB_BUDGET_SHARE = 0.75
+
+# Backfill of historical model breaches
+DEFAULT_BACKFILL_CHUNK_HOURS = 6
+DEFAULT_BACKFILL_MAX_BREACHES = 5000
+
+# HTTP session defaults
+REQUEST_TIMEOUT = 10
+DEFAULT_POOL_SIZE = 10
+DEFAULT_CONNECT_RETRIES = 3
+CONNECT_RETRY_BACKOFF_FACTOR = 0.3
+DEFAULT_MAX_CONCURRENT_REQUESTS = 4
+MAX_DEBUG_BODY_BYTES = 4096
+STREAM_CHUNK_SIZE = 65536
+
+# Response cache
+CACHE_FILE_NAME = "darktrace_response_cache.db"
+CACHE_MAX_ENTRIES = 5000
+CACHE_TTLS = {
+    DEVICE_SUMMARY_ENDPOINT: 300,
+    DEVICES_ENDPOINT: 300,
+    TAG_ENTITIES_ENDPOINT: 60,
+}
+
+# Bulk actions
+BULK_WORKERS = 8
+BULK_RETRY_ROUNDS = 1
+
+# Breach connections
+DEFAULT_CONNECTIONS_EVENT_TYPE = "connection"
+DEFAULT_CONNECTIONS_LIMIT = 1000
+DEFAULT_CONNECTIONS_TOP_N = 10
+
+# Rate limiting and retries
+# Off by default, as a limit low enough to spare the master throttles the bulk actions
+DEFAULT_RATE_LIMIT = 0
+RATE_LIMIT_BURST = 10
+DEFAULT_MAX_RETRIES = 3
+RETRY_BACKOFF_BASE = 1.0
+RETRY_BACKOFF_MAX = 30.0
+RETRY_DEFAULT_BUDGET = 10
+RETRY_ENDPOINT_BUDGETS = {
+    MODEL_BREACH_ENDPOINT: 30,
+    AI_ANALYST_ENDPOINT: 10,
+}
+
+# Model breach time slicing
+MB_SLICE_INITIAL_MINUTES = 60
+MB_SLICE_MIN_MINUTES = 1
+MB_SLICE_MAX_MINUTES = 6 * 60
+MB_SLICE_TARGET_SIZE = 500
+MB_SLICE_TIMEOUT = 30
+MB_STREAM_BATCH_SIZE = 100
+
+# Poll metrics
+POLL_METRICS_HISTORY_SIZE = 48
+
+# Profiling
+PROFILE_ENV_VAR = "DARKTRACE_PROFILE"
+DEFAULT_PROFILE_TOP_N = 25
+
+# Connector state keys
+LAST_POLL_STATE_KEY = "last_poll"
+MB_WATERMARK_STATE_KEY = "last_poll_mb"
+AIA_WATERMARK_STATE_KEY = "last_poll_aia"
+MB_DEDUP_STATE_KEY = "mb_dedup"
+AIA_DIGEST_STATE_KEY = "aia_digest"
+LEGACY_SEEN_MB_IDS_STATE_KEY = "seen_mb_ids"
+POLL_METRICS_STATE_KEY = "poll_metrics"
+MB_BACKFILL_STATE_KEY = "mb_backfill"
+MB_RESUME_STATE_KEY = "mb_resume"
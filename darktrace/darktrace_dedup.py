@@ -0,0 +1,161 @@
+# Copyright (c) 2025-2026 Splunk Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# File: darktrace_dedup.py
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+
+"""
+Indexes of already ingested Darktrace data, persisted in connector state
+"""
+
+from typing import Any, Optional
+
+
+class SeenIndex:
+    """
+    Index of ingested model breach ids (pbids) and the time they were first seen.
+
+    Membership checks are O(1). In connector state the index is stored compactly as two
+    integer lists sorted by pbid: the pbids delta-encoded, and the first seen times as
+    offsets from the oldest one. Entries older than the retention are expired and the
+    oldest entries are evicted once the index holds more than `max_entries`.
+    """
+
+    VERSION = 1
+
+    def __init__(self, retention_seconds: int, max_entries: int):
+        self.retention_seconds = retention_seconds
+        self.max_entries = max_entries
+        self._first_seen = {}  # type: Dict[int, int]
+
+    @classmethod
+    def from_state(cls, serialized: Optional[dict[str, Any]], retention_seconds: int, max_entries: int) -> "SeenIndex":
+        """Load an index from connector state, starting empty if there is none or it has an unknown format"""
+        index = cls(retention_seconds, max_entries)
+        if serialized and serialized.get("v") == cls.VERSION:
+            pbid = 0
+            base = serialized.get("base", 0)
+            for pbid_delta, seen_offset in zip(serialized.get("ids", []), serialized.get("seen", [])):
+                pbid += pbid_delta
+                index._first_seen[pbid] = base + seen_offset
+        return index
+
+    def __contains__(self, pbid: Any) -> bool:
+        return int(pbid) in self._first_seen
+
+    def __len__(self) -> int:
+        return len(self._first_seen)
+
+    def add(self, pbid: Any, seen_at: int):
+        """Record a pbid as seen at an epoch time in seconds, keeping the earliest time"""
+        self._first_seen.setdefault(int(pbid), seen_at)
+
+    def migrate(self, legacy_pbids: Optional[list[Any]], seen_at: int):
+        """Add the pbids of the `seen_mb_ids` list kept in connector state by older app versions"""
+        for pbid in legacy_pbids or []:
+            self.add(pbid, seen_at)
+
+    def expire(self, current_time: int):
+        """Drop entries older than the retention, then the oldest entries above the size limit"""
+        cutoff = current_time - self.retention_seconds
+        self._first_seen = {pbid: seen for pbid, seen in self._first_seen.items() if seen >= cutoff}
+
+        if len(self._first_seen) > self.max_entries:
+            newest = sorted(self._first_seen.items(), key=lambda entry: entry[1])[-self.max_entries :]
+            self._first_seen = dict(newest)
+
+    def to_state(self) -> dict[str, Any]:
+        """Serialize the index for connector state"""
+        base = min(self._first_seen.values(), default=0)
+        pbid_deltas = []
+        seen_offsets = []
+        previous = 0
+        for pbid in sorted(self._first_seen):
+            pbid_deltas.append(pbid - previous)
+            seen_offsets.append(self._first_seen[pbid] - base)
+            previous = pbid
+        return {"v": self.VERSION, "base": base, "ids": pbid_deltas, "seen": seen_offsets}
+
+
+class IncidentDigest:
+    """
+    Digest of ingested AI Analyst incidents, keyed by the `currentGroup` of their events.
+
+    For each incident it keeps the id of its container, the version of every ingested event
+    and the last time the incident was polled. This lets a poll skip unchanged incidents and
+    append only new events to changed ones. Incidents not polled within the retention are expired.
+    """
+
+    VERSION = 1
+
+    def __init__(self, retention_seconds: int):
+        self.retention_seconds = retention_seconds
+        self._incidents = {}  # type: Dict[str, dict]
+
+    @classmethod
+    def from_state(cls, serialized: Optional[dict[str, Any]], retention_seconds: int) -> "IncidentDigest":
+        """Load a digest from connector state, starting empty if there is none or it has an unknown format"""
+        digest = cls(retention_seconds)
+        if serialized and serialized.get("v") == cls.VERSION:
+            digest._incidents = serialized.get("incidents", {})
+        return digest
+
+    @staticmethod
+    def event_version(incident_event: dict[str, Any]) -> int:
+        """Version of an incident event, which moves on whenever AI Analyst extends its activity periods"""
+        periods = incident_event.get("periods") or []
+        return max((period.get("end") or 0 for period in periods), default=0)
+
+    def container_id(self, incident_id: str) -> Optional[str]:
+        """Id of the container an incident was ingested into, or None if it was never ingested"""
+        incident = self._incidents.get(incident_id)
+        return incident["container"] if incident else None
+
+    def diff(self, incident_id: str, incident_events: list[dict[str, Any]]) -> tuple[list[dict[str, Any]], bool]:
+        """
+        Compare incident events with the digest.
+
+        Returns a tuple of (events not ingested yet, whether anything changed)
+        """
+        ingested = self._incidents.get(incident_id, {}).get("events", {})
+        new_events = [event for event in incident_events if event["id"] not in ingested]
+        changed = bool(new_events) or any(
+            ingested[event["id"]] != self.event_version(event) for event in incident_events if event["id"] in ingested
+        )
+        return new_events, changed
+
+    def record(self, incident_id: str, container_id: str, incident_events: list[dict[str, Any]], seen_at: int):
+        """Record an incident as polled at an epoch time in seconds, along with its ingested events"""
+        incident = self._incidents.setdefault(incident_id, {"container": container_id, "events": {}})
+        incident["seen"] = seen_at
+        for event in incident_events:
+            incident["events"][event["id"]] = self.event_version(event)
+
+    def expire(self, current_time: int):
+        """Drop incidents that were not polled within the retention"""
+        cutoff = current_time - self.retention_seconds
+        self._incidents = {incident_id: incident for incident_id, incident in self._incidents.items() if incident["seen"] >= cutoff}
+
+    def to_state(self) -> dict[str, Any]:
+        """Serialize the digest for connector state"""
+        return {"v": self.VERSION, "incidents": self._incidents}
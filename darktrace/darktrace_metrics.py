@@ -0,0 +1,142 @@
+# Copyright (c) 2025-2026 Splunk Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# File: darktrace_metrics.py
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+
+"""
+Timings and counters of a poll, kept as a rolling history in connector state,
+request timings by endpoint, and profiling of action runs
+"""
+
+import cProfile
+import io
+import pstats
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any, Callable, TypeVar
+
+
+T = TypeVar("T")
+
+
+class PollMetrics:
+    """
+    Per-phase timings and counters of one poll.
+
+    The phases are `fetch` (waiting for the Darktrace API), `parse` (decoding JSON), `build`
+    (building containers and artifacts) and `save` (saving them to SOAR). Fetching and parsing
+    run on background threads while containers are built and saved, so the phase times can
+    add up to more than the poll time. Metrics can be updated from several threads.
+    """
+
+    PHASES = ("fetch", "parse", "build", "save")
+    COUNTERS = ("bytes_fetched", "items_parsed", "containers_saved", "artifacts_saved", "retries", "dedup_hits")
+
+    def __init__(self):
+        self._started = time.perf_counter()
+        self._seconds = dict.fromkeys(self.PHASES, 0.0)
+        self._counts = dict.fromkeys(self.COUNTERS, 0)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time a block of code as part of a phase"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, phase: str, seconds: float):
+        """Add time spent in a phase"""
+        with self._lock:
+            self._seconds[phase] += seconds
+
+    def count(self, counter: str, amount: int = 1):
+        """Increment a counter"""
+        with self._lock:
+            self._counts[counter] += amount
+
+    def summary(self) -> dict[str, Any]:
+        """The poll time, the time spent in each phase in seconds, and the counters"""
+        with self._lock:
+            summary = {"poll_seconds": round(time.perf_counter() - self._started, 3)}  # type: Dict[str, Any]
+            summary.update({f"{phase}_seconds": round(seconds, 3) for phase, seconds in self._seconds.items()})
+            summary.update(self._counts)
+        return summary
+
+    def record(self, state: dict[str, Any], key: str, history_size: int, **fields: Any) -> dict[str, Any]:
+        """Append the summary and any extra fields to the history in connector state, keeping the latest `history_size` entries"""
+        entry = {**fields, **self.summary()}
+        history = state.get(key)
+        if not isinstance(history, list):
+            history = []
+        history.append(entry)
+        state[key] = history[-history_size:]
+        return entry
+
+
+class EndpointTimings:
+    """
+    Number of requests and time spent waiting for responses per API endpoint,
+    shared by all clients of an action run. Timings can be added from several threads.
+    """
+
+    def __init__(self):
+        self._timings = {}  # type: Dict[str, List[float]]
+        self._lock = threading.Lock()
+
+    def add(self, endpoint: str, seconds: float):
+        """Add the time of one request to an endpoint"""
+        with self._lock:
+            timing = self._timings.setdefault(endpoint, [0, 0.0, 0.0])
+            timing[0] += 1
+            timing[1] += seconds
+            timing[2] = max(timing[2], seconds)
+
+    def summary(self) -> dict[str, dict[str, Any]]:
+        """Requests, total and maximum seconds per endpoint, slowest endpoint first"""
+        with self._lock:
+            timings = sorted(self._timings.items(), key=lambda item: item[1][1], reverse=True)
+        return {
+            endpoint: {"requests": requests, "total_seconds": round(total, 3), "max_seconds": round(longest, 3)}
+            for endpoint, (requests, total, longest) in timings
+        }
+
+
+def profile_call(call: Callable[[], T], top_n: int) -> tuple[T, str]:
+    """
+    Run a call under cProfile. Only the calling thread is profiled.
+
+    Returns a tuple of (result, report of the `top_n` functions with the most cumulative time)
+    """
+    profiler = cProfile.Profile()
+    try:
+        result = profiler.runcall(call)
+    finally:
+        report = io.StringIO()
+        pstats.Stats(profiler, stream=report).strip_dirs().sort_stats(pstats.SortKey.CUMULATIVE).print_stats(top_n)
+    return result, report.getvalue()
@@ -27,8 +27,18 @@
 import datetime
 import enum
 import json
-from collections.abc import Mapping
-from typing import Union
+import queue
+import threading
+from collections.abc import Iterable, Iterator, Mapping
+from concurrent.futures import Executor
+from typing import Any, Callable, Optional, TypeVar, Union
+
+
+T = TypeVar("T")
+
+
+POLL_TIME_FORMAT = "%Y-%m-%dT%H:%M:%S.00Z"
+CONFIG_TIME_FORMATS = ("%Y-%m-%d", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%SZ")
 
 
 class SplunkSeverity(enum.Enum):
@@ -91,23 +101,189 @@ def nget(structure: Union[dict, list, tuple], *fields: Union[str, int], default:
     returning a default value if any error occurs or no value is found
     """
 
-    while fields:
-        try:
-            structure = structure[fields[0]]
-        except (KeyError, TypeError, IndexError):
-            return default
+    try:
+        for field in fields:
+            structure = structure[field]
+    except (KeyError, TypeError, IndexError):
+        return default
 
-        fields = fields[1:]
     if structure is None or structure == "":
         return default
     return structure
 
 
+_MISSING = object()
+
+
+def npath(*fields: Union[str, int], default: str = "Unknown") -> Callable[[Union[dict, list, tuple]], Any]:
+    """
+    Compile a path into a JSON structure once, to apply it to many structures.
+    The returned accessor is equivalent to `nget(structure, *fields, default=default)`,
+    with the lookups unrolled for paths of up to three fields.
+    """
+
+    if len(fields) == 1:
+        (first,) = fields
+
+        def get(structure):
+            try:
+                value = structure[first]
+            except (KeyError, TypeError, IndexError):
+                return default
+            return default if value is None or value == "" else value
+
+    elif len(fields) == 2:
+        first, second = fields
+
+        def get(structure):
+            try:
+                value = structure[first][second]
+            except (KeyError, TypeError, IndexError):
+                return default
+            return default if value is None or value == "" else value
+
+    elif len(fields) == 3:
+        first, second, third = fields
+
+        def get(structure):
+            try:
+                value = structure[first][second][third]
+            except (KeyError, TypeError, IndexError):
+                return default
+            return default if value is None or value == "" else value
+
+    else:
+
+        def get(structure):
+            return nget(structure, *fields, default=default)
+
+    return get
+
+
+class NPaths:
+    """
+    Several paths into a JSON structure, extracted together in a single walk.
+
+    Calling it returns a tuple with the value of each path, equivalent to calling `nget` for
+    each path. Prefixes shared by the paths, such as ("model", "then"), are looked up once.
+    The walk is compiled into a function with every lookup unrolled, as `npath` does for a
+    single path, so extracting many fields is cheaper than one accessor per field.
+    """
+
+    def __init__(self, *paths: tuple[Union[str, int], ...], default: str = "Unknown"):
+        self.paths = paths
+        self.default = default
+
+        # Each step looks up a field in the value of an earlier step, step 0 being the structure.
+        # Fields are passed in the namespace of the function, never written into its source.
+        # A lookup in a missing value raises TypeError, so missing values carry down the walk.
+        lines = ["def extract(structure):", "    value0 = structure"]
+        namespace = {"_MISSING": _MISSING, "default": default}  # type: Dict[str, Any]
+        step_of_prefix = {(): 0}  # type: Dict[tuple, int]
+        slots = []  # type: List[int]
+        for path in paths:
+            for depth in range(1, len(path) + 1):
+                prefix = path[:depth]
+                if prefix not in step_of_prefix:
+                    step = len(step_of_prefix)
+                    namespace[f"field{step}"] = path[depth - 1]
+                    lines += [
+                        "    try:",
+                        f"        value{step} = value{step_of_prefix[path[: depth - 1]]}[field{step}]",
+                        "    except (KeyError, TypeError, IndexError):",
+                        f"        value{step} = _MISSING",
+                    ]
+                    step_of_prefix[prefix] = step
+            slots.append(step_of_prefix[path])
+        values = "".join(f'default if value{slot} is _MISSING or value{slot} is None or value{slot} == "" else value{slot}, ' for slot in slots)
+        lines.append(f"    return ({values})")
+        exec("\n".join(lines), namespace)
+        self._extract = namespace["extract"]  # type: Callable[[Union[dict, list, tuple]], tuple]
+
+    def __call__(self, structure: Union[dict, list, tuple]) -> tuple:
+        return self._extract(structure)
+
+
 def now() -> datetime.datetime:
     """Returns datetime aware UTC time now"""
     return datetime.datetime.now(datetime.timezone.utc)
 
 
+def parse_poll_time(value: Optional[str]) -> Optional[datetime.datetime]:
+    """Parse a time stored in connector state, returning None if it is missing or malformed"""
+    if not value:
+        return None
+    try:
+        return datetime.datetime.strptime(value, POLL_TIME_FORMAT).replace(tzinfo=datetime.timezone.utc)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_config_time(value: Optional[str]) -> Optional[datetime.datetime]:
+    """
+    Parse a UTC date or time from the asset config, like `2025-01-31` or `2025-01-31T12:00:00`.
+    Returns None if it is unset, and raises a ValueError if it is malformed.
+    """
+    if not value or not str(value).strip():
+        return None
+    for time_format in CONFIG_TIME_FORMATS:
+        try:
+            return datetime.datetime.strptime(str(value).strip(), time_format).replace(tzinfo=datetime.timezone.utc)
+        except ValueError:
+            continue
+    raise ValueError(f"Invalid date or time {value!r}, expected a UTC time like 2025-01-31 or 2025-01-31T12:00:00")
+
+
+def parse_id_list(value: Union[str, int]) -> list[int]:
+    """Parse a comma separated list of integer IDs, dropping duplicates but keeping their order"""
+    ids = [int(item) for item in str(value).split(",") if item.strip()]
+    return list(dict.fromkeys(ids))
+
+
 def stringify_data(data: Mapping) -> str:
     """Stringify a params or data dict without encoding"""
     return "&".join([f"{k}={v}" for k, v in data.items()])
+
+
+def iterate_in_background(executor: Executor, iterable: Iterable[T], max_buffered: int) -> Iterator[T]:
+    """
+    Iterate over an iterable on an executor thread, running at most `max_buffered` items ahead of
+    the consumer. Exceptions raised by the iterable are re-raised to the consumer, and the
+    background iteration stops when the returned generator is exhausted or closed. Consumers that
+    may stop early or raise must close it, e.g. with `contextlib.closing`, or the background
+    iteration keeps waiting for them and blocks the shutdown of the executor.
+    """
+    buffer = queue.Queue(maxsize=max_buffered)  # type: queue.Queue
+    stopped = threading.Event()
+    finished = object()
+
+    def put(entry: tuple) -> bool:
+        while not stopped.is_set():
+            try:
+                buffer.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+        except Exception as excep:
+            put((finished, excep))
+            return
+        put((finished, None))
+
+    executor.submit(produce)
+    try:
+        while True:
+            item, excep = buffer.get()
+            if item is finished:
+                if excep is not None:
+                    raise excep
+                return
+            yield item
+    finally:
+        stopped.set()
@@ -28,7 +28,8 @@ from typing import Any
 
 import phantom.app as phantom
 
-from ..darktrace_utils import SplunkSeverity, nget
+from ..darktrace_consts import BULK_WORKERS
+from ..darktrace_utils import SplunkSeverity, nget, parse_id_list
 from .darktrace_handler import DarktraceHandler
 
 
@@ -144,6 +145,110 @@ class DeviceHandler(DarktraceHandler):
 
         return self.action_result.set_status(phantom.APP_SUCCESS)
 
+    def _handle_bulk_post_tag(self) -> bool:
+        """
+        Handler for `bulk_post_tag` action.
+
+        Params:
+            tag
+            device_ids (Optional: comma separated list of device IDs)
+            source_tag (Optional: tag the devices that carry this tag)
+            duration (Optional: Length of time to apply the tag for)
+
+        Devices that already carry the tag are skipped, the rest are tagged concurrently.
+        """
+
+        tag = self.param["tag"]
+        duration = int(self.param["duration"]) if self.param.get("duration") else None
+        source_tag = self.param.get("source_tag")
+        try:
+            device_ids = parse_id_list(self.param.get("device_ids") or "")
+        except ValueError:
+            return self.action_result.set_status(phantom.APP_ERROR, "Device IDs must be a comma separated list of integers")
+
+        if not device_ids and not source_tag:
+            return self.action_result.set_status(phantom.APP_ERROR, "Either device IDs or a source tag must be given")
+
+        if source_tag:
+            action_status, source_devices = self._client.get_tagged_devices(self.action_result, source_tag)
+            if phantom.is_fail(action_status):
+                self.save_progress("Failed retrieving devices for source tag")
+                return self.action_result.get_status()
+            device_ids = list(dict.fromkeys(device_ids + [int(device["did"]) for device in source_devices["devices"]]))
+
+        action_status, tagged_devices = self._client.get_tagged_devices(self.action_result, tag)
+        if phantom.is_fail(action_status):
+            self.save_progress("Failed retrieving devices for tag")
+            return self.action_result.get_status()
+        already_tagged = {int(device["did"]) for device in tagged_devices["devices"]}
+
+        to_tag = [did for did in device_ids if did not in already_tagged]
+        outcomes = self._call_concurrently([(self._client.post_tag_to_device, (did, tag, duration)) for did in to_tag], BULK_WORKERS)
+        tag_results = dict(zip(to_tag, outcomes))
+
+        counts = {"tagged": 0, "skipped": 0, "failed": 0}
+        for did in device_ids:
+            if did in already_tagged:
+                status, message = "skipped", "Device already has the tag"
+            else:
+                success, result = tag_results[did]
+                status, message = ("tagged", "") if success else ("failed", str(result))
+            counts[status] += 1
+            self.action_result.add_data({"did": did, "status": status, "message": message})
+
+        self.action_result.update_summary(
+            {
+                "total_devices": len(device_ids),
+                "tagged_devices": counts["tagged"],
+                "skipped_devices": counts["skipped"],
+                "failed_devices": counts["failed"],
+            }
+        )
+
+        if to_tag and counts["failed"] == len(to_tag):
+            return self.action_result.set_status(phantom.APP_ERROR, "Failed tagging every device")
+        return self.action_result.set_status(phantom.APP_SUCCESS)
+
+    def _handle_enrich_devices(self) -> bool:
+        """
+        Handler for `enrich_devices` action.
+
+        Takes `device_ids` (comma separated list of device IDs) as a parameter.
+        Fetches the summary, tags and details of every device concurrently and adds one merged result per device.
+        """
+
+        try:
+            device_ids = parse_id_list(self.param["device_ids"])
+        except ValueError:
+            return self.action_result.set_status(phantom.APP_ERROR, "Device IDs must be a comma separated list of integers")
+
+        lookups = {
+            "summary": self._client.get_device_summary,
+            "tags": self._client.get_tags_for_device,
+            "device": self._client.get_device,
+        }
+        requests_made = [(did, name) for did in device_ids for name in lookups]
+        results = self._call_concurrently([(lookups[name], (did,)) for did, name in requests_made], BULK_WORKERS)
+
+        enriched = {did: {"did": did, "summary": None, "tags": None, "device": None, "errors": []} for did in device_ids}
+        for (did, name), (success, result) in zip(requests_made, results):
+            if success:
+                enriched[did][name] = result["data"] if name == "summary" else result
+            else:
+                enriched[did]["errors"].append(f"{name}: {result}")
+
+        for device in enriched.values():
+            self.action_result.add_data(device)
+
+        failed_devices = sum(1 for device in enriched.values() if device["errors"])
+        self.action_result.update_summary(
+            {"total_devices": len(device_ids), "successful_devices": len(device_ids) - failed_devices, "failed_devices": failed_devices}
+        )
+
+        if device_ids and failed_devices == len(device_ids):
+            return self.action_result.set_status(phantom.APP_ERROR, "Failed retrieving data for every device")
+        return self.action_result.set_status(phantom.APP_SUCCESS)
+
     def _add_device_info_to_summary(self, devices: list[dict[str, Any]]):
         """
         Add device info from a list of devices to the action result summary
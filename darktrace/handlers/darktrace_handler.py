@@ -25,8 +25,11 @@
 # and limitations under the License.
 
 from abc import ABCMeta
-from typing import TYPE_CHECKING, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Callable, Optional
 
+import phantom.app as phantom
+import requests
 from phantom.action_result import ActionResult
 
 from ..client.darktrace_client import DarktraceClient
@@ -66,3 +69,30 @@ class DarktraceHandler(metaclass=ABCMeta):
     def save_artifacts(self, artifact: list[dict]) -> tuple[bool, str, Optional[list[str]]]:
         """Saves artifacts. Returns a tuple of (status, status_message, List[id] or None)"""
         return self._connector.save_artifacts(artifact)
+
+    def _call_concurrently(self, calls: list[tuple[Callable[..., tuple[bool, Any]], tuple]], max_workers: int) -> list[tuple[bool, Any]]:
+        """
+        Run the (client method, arguments) calls of a bulk action on at most `max_workers` threads.
+
+        Each in-flight call holds a thread, so concurrency is bounded by `max_workers` as well as by
+        the client's concurrent request limit. Returns a (success, result or error message) tuple per call, in order.
+        """
+        if not calls:
+            return []
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(calls))) as executor:
+            return list(executor.map(lambda call: self._call_isolated(call[0], *call[1]), calls))
+
+    def _call_isolated(self, call: Callable[..., tuple[bool, Any]], *args: Any) -> tuple[bool, Any]:
+        """
+        Run one client call of a bulk action against its own action result, so failures stay with the item.
+
+        Returns a tuple of (success, result or error message)
+        """
+        call_result = ActionResult()
+        try:
+            action_status, result = call(call_result, *args)
+        except requests.RequestException as excep:
+            return False, str(excep)
+        if phantom.is_fail(action_status):
+            return False, call_result.get_message()
+        return True, result
@@ -0,0 +1,149 @@
+# Copyright (c) 2025-2026 Splunk Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# File: darktrace_ingest.py
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+
+import time
+from typing import TYPE_CHECKING, Any, Optional
+
+import phantom.app as phantom
+
+from ..darktrace_metrics import PollMetrics
+
+
+if TYPE_CHECKING:
+    from .darktrace_handler import DarktraceHandler
+
+
+class PollBudget:
+    """
+    Wall-clock and item budgets of one poll, where a limit of 0 is unlimited.
+
+    The poll checks `exhausted` before ingesting each item and stops cleanly once it is,
+    leaving the rest for the next poll. `exhausted_by` names the budget that ran out.
+    """
+
+    def __init__(self, max_seconds: float, max_items: int):
+        self.max_seconds = max_seconds
+        self.deadline = time.monotonic() + max_seconds if max_seconds > 0 else None
+        self.max_items = max_items
+        self.items = 0
+        self.exhausted_by = None  # type: Optional[str]
+
+    @property
+    def exhausted(self) -> bool:
+        """Whether the poll is out of time or items"""
+        if self.exhausted_by is None:
+            if self.max_items and self.items >= self.max_items:
+                self.exhausted_by = "items"
+            elif self.deadline is not None and time.monotonic() >= self.deadline:
+                self.exhausted_by = "time"
+        return self.exhausted_by is not None
+
+    def spend(self, items: int = 1):
+        """Count ingested items against the budget"""
+        self.items += items
+
+    def share(self, fraction: float) -> "PollBudget":
+        """A new budget limited to a fraction of this one's time and items, for one part of the poll"""
+        max_items = max(int(self.max_items * fraction), 1) if self.max_items else 0
+        return PollBudget(self.max_seconds * fraction, max_items)
+
+
+class IngestBatcher:
+    """
+    Batches the container and artifact saves of a poll.
+
+    New containers are saved in one call with their artifacts embedded. Artifacts for existing
+    containers are queued per item and saved in chunks of about `batch_size` artifacts. A chunk
+    that fails is saved again item by item, so failures are reported for the items that caused them.
+    Time spent saving is added to the save phase of `metrics` when given.
+    """
+
+    def __init__(self, handler: "DarktraceHandler", batch_size: int, metrics: Optional[PollMetrics] = None):
+        self._handler = handler
+        self.batch_size = max(batch_size, 1)
+        self._metrics = metrics or PollMetrics()
+        self._pending = []  # type: List[Tuple[Any, List[dict]]]
+        self.saved_items = []  # type: List[Any]
+        self.failures = []  # type: List[dict]
+        self.containers_saved = 0
+        self.artifacts_saved = 0
+
+    def save_container(self, item: Any, container: dict[str, Any], artifacts: list[dict[str, Any]]) -> Optional[str]:
+        """Save a container together with its artifacts. Returns the container id, or None if saving failed."""
+        embedded_artifacts = [{key: value for key, value in artifact.items() if key != "container_id"} for artifact in artifacts]
+        with self._metrics.phase("save"):
+            action_status, creation_msg, container_id = self._handler.save_container({**container, "artifacts": embedded_artifacts})
+        if phantom.is_fail(action_status):
+            self._fail(item, f"Error creating container: {creation_msg}")
+            return None
+
+        self.containers_saved += 1
+        self.artifacts_saved += len(artifacts)
+        self._handler.save_progress(f"Container saved - {container_id}")
+        return container_id
+
+    def add_artifacts(self, item: Any, artifacts: list[dict[str, Any]]):
+        """Queue the artifacts of an item for an existing container, saving a chunk once enough are queued"""
+        self._pending.append((item, artifacts))
+        if sum(len(item_artifacts) for _, item_artifacts in self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Save all queued artifacts"""
+        pending, self._pending = self._pending, []
+        chunk = []  # type: List[Tuple[Any, List[dict]]]
+        chunk_size = 0
+        for item, artifacts in pending:
+            chunk.append((item, artifacts))
+            chunk_size += len(artifacts)
+            if chunk_size >= self.batch_size:
+                self._save_chunk(chunk)
+                chunk, chunk_size = [], 0
+        if chunk:
+            self._save_chunk(chunk)
+
+    def _save_chunk(self, chunk: list[tuple[Any, list[dict[str, Any]]]]):
+        """Save the artifacts of several items in one call, falling back to one call per item on failure"""
+        artifacts = [artifact for _, item_artifacts in chunk for artifact in item_artifacts]
+        with self._metrics.phase("save"):
+            creation_status, creation_msg, artifact_ids = self._handler.save_artifacts(artifacts)
+        if phantom.is_success(creation_status):
+            self.artifacts_saved += len(artifacts)
+            self.saved_items.extend(item for item, _ in chunk)
+            self._handler.save_progress(f"Artifacts saved - {artifact_ids}")
+            return
+
+        if len(chunk) == 1:
+            self._fail(chunk[0][0], f"Error creating artifacts: {creation_msg}")
+            return
+
+        for item_chunk in chunk:
+            self._save_chunk([item_chunk])
+
+    def _fail(self, item: Any, message: str):
+        """Record a failed item"""
+        self._handler.debug_print(message, item)
+        self.failures.append({"item": item, "message": message})
@@ -24,15 +24,33 @@
 # either express or implied. See the License for the specific language governing permissions
 # and limitations under the License.
 
+import functools
 from datetime import datetime
-from typing import Any
+from typing import Any, Callable, Optional
 
 import phantom.app as phantom
-
-from ..darktrace_utils import nget
+from phantom.action_result import ActionResult
+
+from ..client.darktrace_resp_processer import JSONArrayStream
+from ..darktrace_consts import (
+    BULK_RETRY_ROUNDS,
+    BULK_WORKERS,
+    DEFAULT_CONNECTIONS_EVENT_TYPE,
+    DEFAULT_CONNECTIONS_LIMIT,
+    DEFAULT_CONNECTIONS_TOP_N,
+)
+from ..darktrace_utils import NPaths, parse_id_list
 from .darktrace_handler import DarktraceHandler
 
 
+CONNECTION_DEVICE_FIELDS = NPaths(
+    ("destinationDevice", "hostname"),
+    ("destinationDevice", "ip"),
+    ("sourceDevice", "hostname"),
+    ("sourceDevice", "ip"),
+)
+
+
 class ModelBreachHandler(DarktraceHandler):
     def _handle_post_comment(self):
         """
@@ -96,6 +114,92 @@ class ModelBreachHandler(DarktraceHandler):
 
         return self.action_result.set_status(phantom.APP_SUCCESS)
 
+    def _handle_bulk_acknowledge_breaches(self) -> bool:
+        """
+        Handler for `bulk_acknowledge_breaches` action.
+
+        Params:
+            `model_breach_ids`: Comma separated list of the IDs of the model breaches to acknowledge
+        """
+        return self._run_bulk_breach_action(self._client.acknowledge_breach, retry_failures=True)
+
+    def _handle_bulk_unacknowledge_breaches(self) -> bool:
+        """
+        Handler for `bulk_unacknowledge_breaches` action.
+
+        Params:
+            `model_breach_ids`: Comma separated list of the IDs of the model breaches to unacknowledge
+        """
+        return self._run_bulk_breach_action(self._client.unacknowledge_breach, retry_failures=True)
+
+    def _handle_bulk_post_comment(self) -> bool:
+        """
+        Handler for `bulk_post_comment` action.
+
+        Params:
+            `model_breach_ids`: Comma separated list of the IDs of the model breaches to comment on
+            `message`: The comment to post
+
+        Failed comments are not posted again, as a comment that reached the Darktrace master would be duplicated.
+        """
+        post_comment = functools.partial(self._client.post_model_breach_comment, comment=self.param["message"])
+        return self._run_bulk_breach_action(post_comment, retry_failures=False)
+
+    def _run_bulk_breach_action(
+        self,
+        call: Callable[[ActionResult, int], tuple[bool, Any]],
+        retry_failures: bool,
+    ) -> bool:
+        """
+        Run a model breach call for every ID in `model_breach_ids`, BULK_WORKERS at a time.
+
+        Failed calls are retried for up to BULK_RETRY_ROUNDS more rounds if `retry_failures` is set.
+        Adds one result with the status of every model breach.
+        """
+
+        try:
+            model_breach_ids = parse_id_list(self.param["model_breach_ids"])
+        except ValueError:
+            return self.action_result.set_status(phantom.APP_ERROR, "Model breach IDs must be a comma separated list of integers")
+
+        results = {
+            pbid: {"model_breach_id": pbid, "status": "failed", "message": "", "attempts": 0, "result": None} for pbid in model_breach_ids
+        }
+        pending = model_breach_ids
+        rounds = 1 + (BULK_RETRY_ROUNDS if retry_failures else 0)
+        for _ in range(rounds):
+            if not pending:
+                break
+            outcomes = self._call_concurrently([(call, (pbid,)) for pbid in pending], BULK_WORKERS)
+
+            failed = []
+            for pbid, (success, result) in zip(pending, outcomes):
+                row = results[pbid]
+                row["attempts"] += 1
+                if success:
+                    row.update({"status": "success", "message": "", "result": result})
+                else:
+                    row["message"] = str(result)
+                    failed.append(pbid)
+            pending = failed
+
+        for row in results.values():
+            self.action_result.add_data(row)
+
+        failed_breaches = len(pending)
+        self.action_result.update_summary(
+            {
+                "total_breaches": len(model_breach_ids),
+                "successful_breaches": len(model_breach_ids) - failed_breaches,
+                "failed_breaches": failed_breaches,
+                "retried_breaches": sum(1 for row in results.values() if row["attempts"] > 1),
+            }
+        )
+
+        if model_breach_ids and failed_breaches == len(model_breach_ids):
+            return self.action_result.set_status(phantom.APP_ERROR, "Failed for every model breach")
+        return self.action_result.set_status(phantom.APP_SUCCESS)
+
     def _handle_get_breach_comments(self) -> bool:
         """
         Handler for `get_breach_comments` action.
@@ -124,23 +228,139 @@ class ModelBreachHandler(DarktraceHandler):
 
         Params:
             `model_breach_id`: The ID of the model breach to get the connections for
+            `count`: Maximum number of events for the Darktrace master to return
+            `start_time`, `end_time`: Time window of the events, in epoch milliseconds
+            `event_type`: Type of events for the Darktrace master to return
+            `limit`: Maximum number of connections, or of connection groups when aggregating, to add to the results, 0 for no limit
+            `aggregate`: Group all connections by source IP, destination IP, destination port and protocol
+            `top_n`: Number of the largest groups to add to the summary when aggregating
         """
 
         model_breach_id = int(self.param["model_breach_id"])
-
-        action_status, connections = self._client.get_breach_connections(self.action_result, model_breach_id)
+        try:
+            count = self._get_optional_int("count")
+            start_time = self._get_optional_int("start_time")
+            end_time = self._get_optional_int("end_time")
+            limit = self._get_optional_int("limit")
+            top_n = self._get_optional_int("top_n")
+        except ValueError as excep:
+            return self.action_result.set_status(phantom.APP_ERROR, str(excep))
+        if limit is None:
+            limit = DEFAULT_CONNECTIONS_LIMIT
+        if top_n is None:
+            top_n = DEFAULT_CONNECTIONS_TOP_N
+        event_type = self.param.get("event_type") or DEFAULT_CONNECTIONS_EVENT_TYPE
+        aggregate = self.param.get("aggregate", False)
+
+        action_status, connections = self._client.get_breach_connections(
+            self.action_result, model_breach_id, stream=True, count=count, start_time=start_time, end_time=end_time, event_type=event_type
+        )
 
         if phantom.is_fail(action_status):
             self.save_progress("Failed model breach connection")
             return self.action_result.get_status()
 
-        for connection in connections:
-            if connection["action"] == "connection":
-                entry = self._get_connection_data(connection)
-                self.action_result.add_data(entry)
+        # Connections are decoded as they are streamed, only the extracted data is kept.
+        # Older Darktrace masters ignore the event type, so other events such as notices are
+        # filtered out here too. New and unusual connections are connection events, but are
+        # also kept when marked with the requested event type.
+        # When aggregating every connection is grouped, and the limit applies to the groups.
+        connection_actions = {"connection", event_type}
+        events = 0
+        added = 0
+        truncated = False
+        groups = dict()  # type: Dict[Tuple[str, str, Any, str], dict]
+        for connection in connections or []:
+            events += 1
+            if connection.get("action") not in connection_actions:
+                continue
+            if aggregate:
+                self._aggregate_connection(groups, connection)
+            elif limit and added >= limit:
+                truncated = True
+                break
+            else:
+                self.action_result.add_data(self._get_connection_data(connection))
+            added += 1
+
+        if isinstance(connections, JSONArrayStream) and connections.failed:
+            self.save_progress("Failed model breach connection")
+            return self.action_result.get_status()
+
+        # A full page of events means the Darktrace master may have more
+        truncated = truncated or bool(count and events >= count) or bool(aggregate and limit and len(groups) > limit)
+        self.action_result.update_summary({"total_connections": added, "truncated": truncated})
+        if aggregate:
+            self._add_aggregated_connections(groups, top_n, limit)
 
         return self.action_result.set_status(phantom.APP_SUCCESS)
 
+    def _aggregate_connection(self, groups: dict[tuple[str, str, Any, str], dict[str, Any]], connection: dict[str, Any]):
+        """Add a connection to its group, keyed by (source IP, destination IP, destination port, protocol)"""
+
+        conn_data = self._get_connection_data(connection)
+        key = (conn_data["src_ip"], conn_data["dest_ip"], conn_data["dest_port"], conn_data["proto"])
+        time = connection["time"]
+
+        group = groups.get(key)
+        if group is None:
+            groups[key] = {
+                "src_ip": conn_data["src_ip"],
+                "src_hostname": conn_data["src_hostname"],
+                "dest_ip": conn_data["dest_ip"],
+                "dest_hostname": conn_data["dest_hostname"],
+                "dest_port": conn_data["dest_port"],
+                "proto": conn_data["proto"],
+                "count": 1,
+                "first_time": time,
+                "last_time": time,
+                "src_ports": {conn_data["src_port"]},
+            }
+            return
+
+        group["count"] += 1
+        group["first_time"] = min(group["first_time"], time)
+        group["last_time"] = max(group["last_time"], time)
+        group["src_ports"].add(conn_data["src_port"])
+
+    def _add_aggregated_connections(self, groups: dict[tuple[str, str, Any, str], dict[str, Any]], top_n: int, limit: int):
+        """
+        Add one result per connection group, largest first and at most `limit` of them unless it is 0,
+        and the `top_n` largest groups to the summary
+        """
+
+        ordered_groups = sorted(groups.values(), key=lambda group: group["count"], reverse=True)
+        for group in ordered_groups[: limit or None]:
+            # Ports are numbers, or "Unknown" when missing
+            src_ports = sorted(group["src_ports"], key=lambda port: (isinstance(port, str), port if isinstance(port, int) else 0, str(port)))
+            group.update(
+                {
+                    "first_time": str(group["first_time"]),
+                    "last_time": str(group["last_time"]),
+                    "src_ports": src_ports,
+                    "src_port_count": len(src_ports),
+                }
+            )
+            self.action_result.add_data(group)
+
+        top_connections = {}
+        for i, group in enumerate(ordered_groups[:top_n]):
+            top_connections[str(i)] = {key: group[key] for key in ("src_ip", "dest_ip", "dest_port", "proto", "count")}
+        self.action_result.update_summary({"total_groups": len(groups), "top_connections": top_connections})
+
+    def _get_optional_int(self, name: str) -> Optional[int]:
+        """Read an optional non-negative integer parameter"""
+        value = self.param.get(name)
+        if value is None or value == "":
+            return None
+        try:
+            value = int(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"Parameter '{name}' must be an integer")
+        if value < 0:
+            raise ValueError(f"Parameter '{name}' must not be negative")
+        return value
+
     def _add_comment_summary(self, comments: list[dict[str, Any]]):
         """Add comment info to the action summary"""
         comment_summary = dict()
@@ -162,10 +382,11 @@ class ModelBreachHandler(DarktraceHandler):
         conn_data = {}
         conn_data["time"] = str(conn["time"])
         conn_data["proto"] = f"{protocol} - {application_protocol}"
-        conn_data["dest_hostname"] = str(nget(conn, "destinationDevice", "hostname"))
-        conn_data["dest_ip"] = str(nget(conn, "destinationDevice", "ip"))
-        conn_data["src_hostname"] = str(nget(conn, "sourceDevice", "hostname"))
-        conn_data["src_ip"] = str(nget(conn, "sourceDevice", "ip"))
+        dest_hostname, dest_ip, src_hostname, src_ip = CONNECTION_DEVICE_FIELDS(conn)
+        conn_data["dest_hostname"] = str(dest_hostname)
+        conn_data["dest_ip"] = str(dest_ip)
+        conn_data["src_hostname"] = str(src_hostname)
+        conn_data["src_ip"] = str(src_ip)
         conn_data["src_port"] = conn.get("sourcePort", "Unknown")
         conn_data["dest_port"] = conn.get("destinationPort", "Unknown")
 
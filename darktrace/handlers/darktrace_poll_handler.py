@@ -25,23 +25,49 @@
 # and limitations under the License.
 
 import dataclasses
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
 from datetime import datetime, timedelta
 from typing import Any, Optional
 
 import phantom.app as phantom
 
 from darktrace.client.darktrace_ai_analyst_objects import AIAnalystArtifact, AIAnalystContainer
-from darktrace.client.darktrace_model_breach_objects import ModelBreachArtifact, ModelBreachContainer
-
-from ..darktrace_utils import now
+from darktrace.client.darktrace_model_breach_objects import ModelBreachBuilder
+from darktrace.client.darktrace_resp_processer import JSONArrayStream
+
+from ..darktrace_backfill import BackfillProgress
+from ..darktrace_consts import (
+    AIA_DIGEST_STATE_KEY,
+    AIA_WATERMARK_STATE_KEY,
+    DEDUP_MAX_ENTRIES,
+    LAST_POLL_STATE_KEY,
+    LEGACY_SEEN_MB_IDS_STATE_KEY,
+    MB_BACKFILL_STATE_KEY,
+    MB_DEDUP_STATE_KEY,
+    MB_RESUME_STATE_KEY,
+    MB_WATERMARK_STATE_KEY,
+    POLL_FETCH_WORKERS,
+    POLL_MB_BUDGET_SHARE,
+    POLL_METRICS_HISTORY_SIZE,
+    POLL_METRICS_STATE_KEY,
+    POLL_PREFETCH_SLICES,
+)
+from ..darktrace_dedup import IncidentDigest, SeenIndex
+from ..darktrace_metrics import PollMetrics
+from ..darktrace_utils import POLL_TIME_FORMAT, iterate_in_background, now, parse_poll_time
 from .darktrace_handler import DarktraceHandler
+from .darktrace_ingest import IngestBatcher, PollBudget
 
 
 class PollHandler(DarktraceHandler):
     """
     Handler for the on_poll action.
 
-    Polls for AI Analyst incidents and Model Breaches
+    Polls for AI Analyst incidents and Model Breaches, and backfills historical
+    model breaches when a backfill range is configured. A poll stops once it runs out
+    of its time or item budget, and the next poll carries on where it stopped
     """
 
     def _handle_on_poll(self) -> bool:
@@ -49,148 +75,428 @@ class PollHandler(DarktraceHandler):
 
         self.save_progress("Polling Darktrace")
 
-        mb_start_time, aia_start_time, end_time = self._determine_time_range()
+        poll_now = self._connector.is_poll_now()
+        last_poll = self._connector._state.get(LAST_POLL_STATE_KEY)
+        self.debug_print(f"Last Poll: {last_poll}")
+        if poll_now:
+            self.debug_print("Run Mode: Poll Now")
+        else:
+            self.debug_print("Run Mode: Scheduled Poll")
 
+        end_time = now()
+        self._metrics = PollMetrics()
+        self._client.metrics = self._metrics
+        retries_before = self._connector.retry_policy.retries
+        self._batcher = IngestBatcher(self, self._connector.artifact_batch_size, self._metrics)
+        self._budget = PollBudget(self._connector.poll_max_seconds, self._connector.poll_max_items)
+        # Hold part of the budget back for AI Analyst incidents, which are ingested after the model
+        # breaches, so a storm of model breaches cannot starve them
+        self._mb_budget = self._budget.share(POLL_MB_BUDGET_SHARE if self._connector.should_poll_ai_analyst else 1)
+
+        mb_start_time, mb_end_time = self._determine_time_range(
+            MB_WATERMARK_STATE_KEY,
+            timedelta(hours=self._connector.mb_first_run_lookback_hours),
+            end_time,
+            resume_time=None if poll_now else parse_poll_time(self._connector._state.get(MB_RESUME_STATE_KEY)),
+        )
+        aia_start_time, aia_end_time = self._determine_time_range(
+            AIA_WATERMARK_STATE_KEY, timedelta(hours=self._connector.aia_first_run_lookback_hours), end_time
+        )
+
+        # Both sources are fetched at the same time on the executor, while
+        # containers are saved from this thread only
         model_breach_error = False
-        if self._connector.should_poll_model_breach:
-            self.debug_print(f"Model Breach Poll Time Range: {mb_start_time} <-> {end_time}")
-            model_breach_error = self._poll_model_breach(mb_start_time, end_time)
-
+        mb_resume_time = None
         aia_error = False
-        if self._connector.should_poll_ai_analyst:
-            self.debug_print(f"AI Analyst Poll Time Range: {aia_start_time} <-> {end_time}")
-            aia_error = self._poll_ai_analyst(aia_start_time, end_time)
+        backfill_error = False
+        with ThreadPoolExecutor(max_workers=POLL_FETCH_WORKERS) as executor:
+            aia_future = None
+            if self._connector.should_poll_ai_analyst:
+                self.debug_print(f"AI Analyst Poll Time Range: {aia_start_time} <-> {aia_end_time}")
+                aia_future = executor.submit(self._fetch_ai_analyst_incidents, aia_start_time, aia_end_time)
+
+            if self._connector.should_poll_model_breach:
+                self.debug_print(f"Model Breach Poll Time Range: {mb_start_time} <-> {mb_end_time}")
+                # Always closed, so the background fetch stops even if ingesting raises
+                with closing(
+                    iterate_in_background(
+                        executor,
+                        self._client.iter_model_breaches(self.action_result, mb_start_time, mb_end_time),
+                        POLL_PREFETCH_SLICES,
+                    )
+                ) as model_breach_slices:
+                    model_breach_error, mb_resume_time = self._poll_model_breach(model_breach_slices)
+                if not model_breach_error:
+                    self._save_resume_time(mb_resume_time)
+                    if mb_resume_time is None:
+                        self._save_watermark(MB_WATERMARK_STATE_KEY, mb_end_time)
+
+            if aia_future is not None:
+                aia_error, aia_stopped = self._poll_ai_analyst(*aia_future.result())
+                if not aia_error and not aia_stopped:
+                    self._save_watermark(AIA_WATERMARK_STATE_KEY, aia_end_time)
+
+            # Historical breaches only get what is left once live model breaches are all ingested
+            if (
+                self._connector.should_poll_model_breach
+                and self._connector.backfill_start
+                and not poll_now
+                and mb_resume_time is None
+                and not self._mb_budget.exhausted
+                and not self._budget.exhausted
+            ):
+                backfill_error = self._backfill_model_breach(executor, end_time)
+
+        self._metrics.count("retries", self._connector.retry_policy.retries - retries_before)
+        self._add_ingest_summary()
+        self._add_budget_summary(mb_resume_time)
+        self._add_metrics(end_time, model_breach_error or aia_error or backfill_error)
 
         if model_breach_error:
             self.debug_print("Error occurred while processing model breaches")
         if aia_error:
             self.debug_print("Error occurred while processing AI Analyst incidents")
+        if backfill_error:
+            self.debug_print("Error occurred while backfilling model breaches")
 
-        if model_breach_error or aia_error:
+        if model_breach_error or aia_error or backfill_error:
             return self.action_result.set_status(phantom.APP_ERROR)
 
-        self._connector._state["last_poll"] = end_time.strftime("%Y-%m-%dT%H:%M:%S.00Z")
+        self._connector._state[LAST_POLL_STATE_KEY] = end_time.strftime(POLL_TIME_FORMAT)
         self.save_progress("Completed poll cycle")
         return self.action_result.set_status(phantom.APP_SUCCESS)
 
-    def _determine_time_range(self) -> tuple[datetime, datetime, datetime]:
+    def _add_ingest_summary(self):
+        """Add the ingestion counts and any failed items to the action result"""
+        self.action_result.update_summary(
+            {
+                "containers_saved": self._batcher.containers_saved,
+                "artifacts_saved": self._batcher.artifacts_saved,
+                "failed_items": len(self._batcher.failures),
+            }
+        )
+        for failure in self._batcher.failures:
+            self.action_result.add_data(failure)
+
+    def _add_budget_summary(self, resume_time: Optional[datetime]):
+        """Add which budget of the poll ran out, if any, and the time model breach polling resumes at to the action result"""
+        exhausted_by = self._budget.exhausted_by or self._mb_budget.exhausted_by
+        if exhausted_by:
+            self.debug_print(f"Poll {exhausted_by} budget exhausted after {self._budget.items} items, resuming next poll")
+        self.action_result.update_summary(
+            {
+                "budget_exhausted": exhausted_by,
+                "resume_time": resume_time.strftime(POLL_TIME_FORMAT) if resume_time else None,
+            }
+        )
+
+    def _add_metrics(self, end_time: datetime, error_occurred: bool):
+        """Add the poll metrics to the action result summary and to the metrics history in connector state"""
+        self._metrics.count("containers_saved", self._batcher.containers_saved)
+        self._metrics.count("artifacts_saved", self._batcher.artifacts_saved)
+        entry = self._metrics.record(
+            self._connector._state,
+            POLL_METRICS_STATE_KEY,
+            POLL_METRICS_HISTORY_SIZE,
+            time=end_time.strftime(POLL_TIME_FORMAT),
+            poll_now=self._connector.is_poll_now(),
+            success=not error_occurred,
+        )
+        self.debug_print("Poll metrics", entry)
+        self.action_result.update_summary(self._metrics.summary())
+
+    def _determine_time_range(
+        self, watermark_key: str, first_run_lookback: timedelta, end_time: datetime, resume_time: Optional[datetime] = None
+    ) -> tuple[datetime, datetime]:
         """
-        Get the time range for a poll.
+        Get the time range for polling one source.
 
-        Returns a tuple of (start_model_breach, start_ai_analyst, end)
-        """
+        Starts at the stored watermark minus the poll overlap, or at the first run lookback when there is
+        no watermark or when polling now. A poll that stopped on its budget resumes at the time it
+        stopped at instead. The range is capped at the maximum catch-up span, so a poll after a
+        long gap catches up over several runs instead of fetching everything at once.
 
-        poll_now = self._connector.is_poll_now()
-        last_poll = self._connector._state.get("last_poll")
+        Returns a tuple of (start, end)
+        """
 
-        end_time = now()
-        mb_start_time = end_time - timedelta(hours=6)
-        aia_start_time = end_time - timedelta(days=1)
+        watermark = None
+        if not self._connector.is_poll_now():
+            watermark = parse_poll_time(self._connector._state.get(watermark_key) or self._connector._state.get(LAST_POLL_STATE_KEY))
 
-        self.debug_print(f"Last Poll: {last_poll}")
-        if poll_now:
-            self.debug_print("Run Mode: Poll Now")
+        if resume_time is not None:
+            start_time = min(resume_time, end_time)
+        elif watermark is None:
+            start_time = end_time - first_run_lookback
         else:
-            self.debug_print("Run Mode: Scheduled Poll")
+            start_time = min(watermark - timedelta(minutes=self._connector.poll_overlap_minutes), end_time)
 
-        return mb_start_time, aia_start_time, end_time
+        return start_time, min(end_time, start_time + timedelta(hours=self._connector.max_catchup_hours))
 
-    def _poll_model_breach(self, start_datetime: datetime, end_datetime: datetime) -> bool:
-        """Poll for model breaches"""
+    def _save_watermark(self, watermark_key: str, end_time: datetime):
+        """Store the end of a successfully polled time range. Poll now runs never move the watermark."""
+        if self._connector.is_poll_now():
+            return
+        self._connector._state[watermark_key] = end_time.strftime(POLL_TIME_FORMAT)
 
-        self.debug_print("Polling Darktrace model breaches")
-        action_status, model_breaches = self._client.get_model_breaches(self.action_result, start_datetime, end_datetime)
+    def _save_resume_time(self, resume_time: Optional[datetime]):
+        """
+        Store the time a model breach poll that stopped on its budget resumes at, or clear it once a poll
+        gets through its whole range. Poll now runs never change the resume time.
+        """
+        if self._connector.is_poll_now():
+            return
+        if resume_time is not None:
+            self._connector._state[MB_RESUME_STATE_KEY] = resume_time.strftime(POLL_TIME_FORMAT)
+        else:
+            self._connector._state.pop(MB_RESUME_STATE_KEY, None)
 
-        if phantom.is_fail(action_status):
-            self.save_progress("Failed posting tag to device")
-            return self.action_result.get_status()
+    def _poll_model_breach(self, model_breach_slices: Iterable[tuple[bool, list[dict], datetime]]) -> tuple[bool, Optional[datetime]]:
+        """
+        Process polled model breaches, one batch at a time as they are streamed.
 
-        self.debug_print(f"{len(model_breaches)} model breaches found")  # type: ignore
-        previous_mb_ids = set(self._connector._state.get("seen_mb_ids", []))  # type: Set[str]
-        current_mb_ids = []  # type: List[str]
+        Returns a tuple of (whether an error occurred, time to resume at if the poll budget stopped it)
+        """
 
-        error_occurred = False
-        new_model_breaches = 0
-        for model_breach in model_breaches:  # type: ignore
-            # Check for already seen breaches
-            mb_id = model_breach["pbid"]
-            current_mb_ids.append(mb_id)
-            if mb_id in previous_mb_ids:
-                continue
+        self.debug_print("Polling Darktrace model breaches")
+        seen_at = int(now().timestamp())
+        seen_index = self._load_seen_index(seen_at)
 
-            new_model_breaches += 1
-            container_id, container = self._save_model_breach(model_breach)
-            if container is None:
-                error_occurred = True
-                continue
-            self._create_model_breach_artifacts(container, model_breach, container_id)
+        error_occurred, resume_time, total_model_breaches, new_model_breaches = self._ingest_model_breaches(
+            model_breach_slices, seen_index, seen_at, [self._budget, self._mb_budget]
+        )
 
+        self.debug_print(f"{total_model_breaches} model breaches found")
         self.debug_print(f"{new_model_breaches} new model breaches found")
 
-        self._connector._state["seen_mb_ids"] = current_mb_ids
+        self._save_seen_index(seen_index, seen_at)
+        return error_occurred, resume_time
+
+    def _backfill_model_breach(self, executor: ThreadPoolExecutor, end_time: datetime) -> bool:
+        """
+        Backfill historical model breaches over the configured range, one chunk at a time.
 
+        Progress is checkpointed in connector state after every chunk, together with the dedup index, so
+        an interrupted backfill resumes after the last complete chunk. Stops as soon as it has ingested the
+        maximum number of breaches per poll, or the poll runs out of its budget, and carries on in the next
+        poll. A chunk cut short is fetched again from the slice it stopped in, minus the breaches already in
+        the dedup index.
+        """
+        connector = self._connector
+        progress = BackfillProgress.from_state(
+            connector._state.get(MB_BACKFILL_STATE_KEY), connector.backfill_start, connector.backfill_end, connector.backfill_order, end_time
+        )
+        chunk_span = timedelta(hours=connector.backfill_chunk_hours)
+
+        seen_at = int(now().timestamp())
+        seen_index = self._load_seen_index(seen_at)
+        backfill_budget = PollBudget(0, connector.backfill_max_breaches)
+        error_occurred = False
+        ingested = 0
+        while not progress.done and not backfill_budget.exhausted and not self._budget.exhausted:
+            chunk = progress.next_chunk(chunk_span)
+            self.debug_print(f"Model Breach Backfill Time Range: {chunk[0]} <-> {chunk[1]}")
+            with closing(
+                iterate_in_background(executor, self._client.iter_model_breaches(self.action_result, *chunk), POLL_PREFETCH_SLICES)
+            ) as model_breach_slices:
+                error_occurred, resume_time, _, new_model_breaches = self._ingest_model_breaches(
+                    model_breach_slices, seen_index, seen_at, [self._budget, backfill_budget]
+                )
+            if error_occurred:
+                break
+
+            if resume_time is not None:
+                progress.advance_within(chunk, resume_time, new_model_breaches)
+            else:
+                progress.advance(chunk, new_model_breaches)
+            ingested += new_model_breaches
+            self._save_seen_index(seen_index, seen_at)
+            connector._state[MB_BACKFILL_STATE_KEY] = progress.to_state()
+            connector.save_state(connector._state)
+
+        self._save_seen_index(seen_index, seen_at)
+        connector._state[MB_BACKFILL_STATE_KEY] = progress.to_state()
+        self.debug_print(f"{ingested} model breaches backfilled, backfill cursor at {progress.cursor}")
+        self.action_result.update_summary(
+            {
+                "backfill_breaches": ingested,
+                "backfill_cursor": progress.cursor.strftime(POLL_TIME_FORMAT),
+                "backfill_complete": progress.done,
+            }
+        )
         return error_occurred
 
-    def _save_model_breach(self, model_breach_dict: dict[str, Any]) -> tuple[str, Optional[ModelBreachContainer]]:
-        """Construct and save a container from a model breach"""
+    def _ingest_model_breaches(
+        self,
+        model_breach_slices: Iterable[tuple[bool, list[dict], datetime]],
+        seen_index: SeenIndex,
+        seen_at: int,
+        budgets: list[PollBudget],
+    ) -> tuple[bool, Optional[datetime], int, int]:
+        """
+        Save the model breaches not in the dedup index, adding them to it, until one of the budgets runs out.
+
+        Breaches are only deduplicated by the index, so the order the master returns them in does not
+        matter. The budgets are checked before each batch and each new breach. When one runs out, the start
+        of the time slice being ingested is returned to resume at: every breach before it has been ingested,
+        and those after it that were are in the index.
 
-        model_breach_container = ModelBreachContainer(model_breach_dict)
-        container = dataclasses.asdict(model_breach_container)
-        action_status, creation_msg, container_id = self.save_container(container=container)
-        if phantom.is_fail(action_status):
-            self.debug_print(creation_msg)
-            err_msg = f"Error creating container for pbid {creation_msg}"
-            self.save_progress(err_msg)
-            self.action_result.set_status(phantom.APP_ERROR, err_msg)
-            return "", None
+        Returns a tuple of (whether an error occurred, time to resume at if a budget stopped it, model breaches found,
+        new model breaches)
+        """
+        builder = ModelBreachBuilder(self._client.base_url)
 
-        self.save_progress(f"Container saved - {container_id}")
-        return container_id, model_breach_container  # type: ignore
+        error_occurred = False
+        resume_time = None
+        total_model_breaches = 0
+        new_model_breaches = 0
+        for action_status, model_breaches, slice_start in model_breach_slices:
+            if phantom.is_fail(action_status):
+                self.save_progress("Failed retrieving model breaches")
+                error_occurred = True
+                break
+
+            # Checked for every batch too, so a slow master or a range of breaches already
+            # seen cannot keep the poll running past its time budget
+            if any(budget.exhausted for budget in budgets):
+                resume_time = slice_start
+                break
+
+            total_model_breaches += len(model_breaches)
+
+            # Check for already seen breaches, keeping the first of any repeated in the batch
+            unseen = {}  # type: Dict[Any, dict]
+            processed = 0
+            for model_breach in model_breaches:
+                mb_id = model_breach["pbid"]
+                if mb_id not in unseen and mb_id not in seen_index:
+                    if any(budget.exhausted for budget in budgets):
+                        resume_time = slice_start
+                        break
+                    for budget in budgets:
+                        budget.spend()
+                    unseen[mb_id] = model_breach
+                processed += 1
+            self._metrics.count("dedup_hits", processed - len(unseen))
+
+            new_model_breaches += len(unseen)
+            with self._metrics.phase("build"):
+                built = builder.build_batch(unseen.values())
+            for mb_id, (container, artifact) in zip(unseen, built):
+                if not self._save_model_breach(mb_id, container, artifact):
+                    error_occurred = True
+                    continue
+                seen_index.add(mb_id, seen_at)
+
+            if resume_time is not None:
+                break
+
+        return error_occurred, resume_time, total_model_breaches, new_model_breaches
+
+    def _load_seen_index(self, seen_at: int) -> SeenIndex:
+        """Load the index of ingested model breaches, migrating the list kept by older app versions"""
+        seen_index = SeenIndex.from_state(
+            self._connector._state.get(MB_DEDUP_STATE_KEY),
+            self._connector.dedup_retention_hours * 3600,
+            DEDUP_MAX_ENTRIES,
+        )
+        seen_index.migrate(self._connector._state.pop(LEGACY_SEEN_MB_IDS_STATE_KEY, None), seen_at)
+        return seen_index
+
+    def _save_seen_index(self, seen_index: SeenIndex, seen_at: int):
+        """Expire the index of ingested model breaches and store it in connector state"""
+        seen_index.expire(seen_at)
+        self._connector._state[MB_DEDUP_STATE_KEY] = seen_index.to_state()
+
+    def _save_model_breach(self, mb_id: Any, container: dict[str, Any], artifact: dict[str, Any]) -> bool:
+        """Save a model breach container built by ModelBreachBuilder, with its artifact embedded"""
+        return self._batcher.save_container(mb_id, container, [artifact]) is not None
+
+    def _fetch_ai_analyst_incidents(self, start_time: datetime, end_time: datetime) -> tuple[bool, dict[str, list[dict]]]:
+        """
+        Stream AI Analyst incident events in a time range and group them into incidents as they are decoded.
 
-    def _create_model_breach_artifacts(self, container: ModelBreachContainer, model_breach_dict: dict[str, Any], container_id: str):
-        """Construct artifacts from a model breach"""
+        Returns a tuple of (status, incidents)
+        """
+        action_status, incident_events = self._client.get_ai_analyst_incidents(self.action_result, start_time, end_time, stream=True)
+        if phantom.is_fail(action_status):
+            return action_status, {}
 
-        model_breach_artifact = ModelBreachArtifact(container, model_breach_dict, container_id, self._client.base_url)
-        artifact = dataclasses.asdict(model_breach_artifact)
-        creation_status, creation_msg, artifact_id_list = self.save_artifacts([artifact])
-        if phantom.is_fail(creation_status):
-            self.debug_print(creation_msg)
-            err_msg = f"Error creating Artifact for pbid {creation_msg}"
-            self.save_progress(err_msg)
-            self.action_result.set_status(phantom.APP_ERROR, err_msg)
+        incidents = self._create_incidents(incident_events or [])  # type: ignore
+        if isinstance(incident_events, JSONArrayStream) and incident_events.failed:
+            return phantom.APP_ERROR, {}
+        return action_status, incidents
 
-        self.save_progress(f"Artifact saved - {artifact_id_list[0]}")  # type: ignore
+    def _poll_ai_analyst(self, action_status: bool, incidents: dict[str, list[dict]]) -> tuple[bool, bool]:
+        """
+        Process polled AI Analyst incidents until the poll budget runs out.
 
-    def _poll_ai_analyst(self, start_datetime: datetime, end_datetime: datetime) -> bool:
-        """Poll for AI Analyst incidents"""
+        The incidents ingested before a stop are in the incident digest, so the next poll, which fetches
+        the same time range again, only ingests the rest.
 
-        self.debug_print("Polling Darktrace AI Analyst incidents")
-        action_status, raw_incident_events = self._client.get_ai_analyst_incidents(self.action_result, start_datetime, end_datetime)
+        Returns a tuple of (whether an error occurred, whether the poll budget stopped it)
+        """
 
+        self.debug_print("Processing Darktrace AI Analyst incidents")
         if phantom.is_fail(action_status):
-            self.save_progress("Failed posting tag to device")
-            return self.action_result.get_status()
-
-        incidents = self._create_incidents(raw_incident_events)  # type: ignore
+            self.save_progress("Failed retrieving AI Analyst incidents")
+            return True, False
 
-        self.debug_print(f"{len(raw_incident_events)} incident events found")  # type: ignore
+        self.debug_print(f"{sum(len(incident_events) for incident_events in incidents.values())} incident events found")
         self.debug_print(f"{len(incidents)} incidents found")
 
-        error_occurred = False
+        seen_at = int(now().timestamp())
+        digest = IncidentDigest.from_state(self._connector._state.get(AIA_DIGEST_STATE_KEY), self._connector.dedup_retention_hours * 3600)
+
+        failures_before = len(self._batcher.failures)
+        queued_events = dict()  # type: Dict[str, Tuple[str, str, dict]]
+        unchanged_incidents = 0
+        stopped = False
         for incident_id, incident_events in incidents.items():
-            # save ai analyst container
-            container_id = self._save_ai_analyst_incident(incident_id, incident_events)
+            new_events, changed = digest.diff(incident_id, incident_events)
+            container_id = digest.container_id(incident_id)
+
+            self._metrics.count("dedup_hits", len(incident_events) - len(new_events))
+            if not changed:
+                unchanged_incidents += 1
+                digest.record(incident_id, container_id, [], seen_at)  # type: ignore
+                continue
+
+            if self._budget.exhausted:
+                stopped = True
+                break
 
             if not container_id:
-                error_occurred = True
+                # save ai analyst container with its artifacts
+                self._budget.spend(len(incident_events))
+                container_id = self._save_ai_analyst_incident(incident_id, incident_events)
+                if container_id:
+                    digest.record(incident_id, container_id, incident_events, seen_at)
                 continue
-            # create one artifact for each container + one artifact per
-            # related model breach
-            self._create_ai_analyst_artifacts(incident_events, container_id)
 
-        return error_occurred
+            self._budget.spend(len(new_events))
+            new_event_ids = {event["id"] for event in new_events}
+            digest.record(incident_id, container_id, [event for event in incident_events if event["id"] not in new_event_ids], seen_at)
+
+            # append the new events to the existing container
+            for incident in new_events:
+                queued_events[incident["id"]] = (incident_id, container_id, incident)
+                self._batcher.add_artifacts(incident["id"], self._create_ai_analyst_artifacts([incident], container_id))
 
-    def _create_incidents(self, incident_events: list[dict]) -> dict[str, list[dict]]:
+        self._batcher.flush()
+        for event_id in self._batcher.saved_items:
+            if event_id in queued_events:
+                incident_id, container_id, incident = queued_events[event_id]
+                digest.record(incident_id, container_id, [incident], seen_at)
+
+        self.debug_print(f"{unchanged_incidents} unchanged incidents skipped")
+        error_occurred = len(self._batcher.failures) > failures_before
+
+        digest.expire(seen_at)
+        self._connector._state[AIA_DIGEST_STATE_KEY] = digest.to_state()
+
+        return error_occurred, stopped
+
+    def _create_incidents(self, incident_events: Iterable[dict]) -> dict[str, list[dict]]:
         """
         Extract incident events into a dictionary of incidents.
 
@@ -209,40 +515,27 @@ class PollHandler(DarktraceHandler):
 
         return incidents
 
-    def _save_ai_analyst_incident(self, incident_id: str, incident_events: list[dict]) -> str:
+    def _save_ai_analyst_incident(self, incident_id: str, incident_events: list[dict]) -> Optional[str]:
         """
-        Constuct and save a container from an incident
+        Constuct and save a container from an incident, with the artifacts of its events embedded
         """
 
-        ai_analyst_container = AIAnalystContainer(incident_id, incident_events)
-        container = dataclasses.asdict(ai_analyst_container)
-        action_status, creation_msg, container_id = self.save_container(container=container)
-        if phantom.is_fail(action_status):
-            self.debug_print(creation_msg)
-            self.save_progress(f"Error creating container for AIAnalyst Incident {creation_msg}")
-            self.action_result.set_status(phantom.APP_ERROR, f"Error creating container for pbid {creation_msg}")
-            return ""
-        self.save_progress(f"Container saved - {container_id}")
-        return container_id  # type: ignore
+        with self._metrics.phase("build"):
+            ai_analyst_container = AIAnalystContainer(incident_id, incident_events)
+        artifacts = self._create_ai_analyst_artifacts(incident_events, "")
+        return self._batcher.save_container(incident_id, dataclasses.asdict(ai_analyst_container), artifacts)
 
-    def _create_ai_analyst_artifacts(self, incident_events: list[dict], container_id: str):
+    def _create_ai_analyst_artifacts(self, incident_events: list[dict], container_id: str) -> list[dict]:
         """
         Create the artifacts for an incident
 
-        Creates an artifact for each incident
+        Creates an artifact for each incident event + one artifact per related model breach
         """
 
-        for incident in incident_events:
-            ai_analyst_artifact = AIAnalystArtifact(incident, container_id, self._client.base_url)
-            incident_artifact = dataclasses.asdict(ai_analyst_artifact)
-            related_breach_artifacts = ai_analyst_artifact.get_breach_artifacts(incident, self._client.base_url)
-            artifacts = [incident_artifact, *related_breach_artifacts]
-            creation_status, creation_msg, artifact_ids = self.save_artifacts(artifacts)
-
-            if phantom.is_fail(creation_status):
-                self.debug_print(creation_msg)
-                err_msg = f"Error creating Artifact for uuid {creation_msg}"
-                self.save_progress(err_msg)
-                self.action_result.set_status(phantom.APP_ERROR, err_msg)
-            else:
-                self.save_progress(f"Artifacts saved - {artifact_ids}")
+        artifacts = []
+        with self._metrics.phase("build"):
+            for incident in incident_events:
+                ai_analyst_artifact = AIAnalystArtifact(incident, container_id, self._client.base_url)
+                artifacts.append(dataclasses.asdict(ai_analyst_artifact))
+                artifacts.extend(ai_analyst_artifact.get_breach_artifacts(incident, self._client.base_url))
+        return artifacts
@@ -25,61 +25,97 @@
 # and limitations under the License.
 
 import json
+import os
 import sys
+import threading
 
 import phantom.app as phantom
 import requests
 from phantom.base_connector import BaseConnector
 
+from darktrace.client.darktrace_cache import ResponseCache
+from darktrace.client.darktrace_client import create_rate_limiter, create_retry_policy, create_session
+from darktrace.darktrace_backfill import BACKFILL_NEWEST_FIRST, BACKFILL_ORDERS
+from darktrace.darktrace_consts import (
+    CACHE_FILE_NAME,
+    CACHE_MAX_ENTRIES,
+    DEFAULT_AIA_FIRST_RUN_LOOKBACK_HOURS,
+    DEFAULT_ARTIFACT_BATCH_SIZE,
+    DEFAULT_BACKFILL_CHUNK_HOURS,
+    DEFAULT_BACKFILL_MAX_BREACHES,
+    DEFAULT_CONNECT_RETRIES,
+    DEFAULT_DEDUP_RETENTION_HOURS,
+    DEFAULT_MAX_CATCHUP_HOURS,
+    DEFAULT_MAX_CONCURRENT_REQUESTS,
+    DEFAULT_MAX_RETRIES,
+    DEFAULT_MB_FIRST_RUN_LOOKBACK_HOURS,
+    DEFAULT_POLL_MAX_ITEMS,
+    DEFAULT_POLL_MAX_SECONDS,
+    DEFAULT_POLL_OVERLAP_MINUTES,
+    DEFAULT_POOL_SIZE,
+    DEFAULT_PROFILE_TOP_N,
+    DEFAULT_RATE_LIMIT,
+    PROFILE_ENV_VAR,
+)
+from darktrace.darktrace_metrics import EndpointTimings, profile_call
+from darktrace.darktrace_utils import parse_config_time
 from darktrace.handlers.darktrace_connectivity_handler import ConnectivityHandler
 from darktrace.handlers.darktrace_device_handler import DeviceHandler
 from darktrace.handlers.darktrace_model_breach_handler import ModelBreachHandler
 from darktrace.handlers.darktrace_poll_handler import PollHandler
 
 
+# Handler class and method for each action ID
+ACTION_HANDLERS = {
+    # Special Purpose Actions
+    "test_connectivity": (ConnectivityHandler, "_handle_test_connectivity"),
+    "on_poll": (PollHandler, "_handle_on_poll"),
+    # Device Actions
+    "get_device_description": (DeviceHandler, "_handle_get_device_description"),
+    "get_device_model_breaches": (DeviceHandler, "_handle_get_device_model_breaches"),
+    "get_device_tags": (DeviceHandler, "_handle_get_tags_for_device"),
+    "get_tagged_devices": (DeviceHandler, "_handle_get_tagged_devices"),
+    "post_tag": (DeviceHandler, "_handle_post_tag_to_device"),
+    "enrich_devices": (DeviceHandler, "_handle_enrich_devices"),
+    "bulk_post_tag": (DeviceHandler, "_handle_bulk_post_tag"),
+    # Model Breach Actions
+    "post_comment": (ModelBreachHandler, "_handle_post_comment"),
+    "acknowledge_breach": (ModelBreachHandler, "_handle_acknowledge_breach"),
+    "unacknowledge_breach": (ModelBreachHandler, "_handle_unacknowledge_breach"),
+    "get_breach_comments": (ModelBreachHandler, "_handle_get_breach_comments"),
+    "get_breach_connections": (ModelBreachHandler, "_handle_get_breach_connections"),
+    "bulk_acknowledge_breaches": (ModelBreachHandler, "_handle_bulk_acknowledge_breaches"),
+    "bulk_unacknowledge_breaches": (ModelBreachHandler, "_handle_bulk_unacknowledge_breaches"),
+    "bulk_post_comment": (ModelBreachHandler, "_handle_bulk_post_comment"),
+}  # type: Dict[str, Tuple[Type[DarktraceHandler], str]]
+
+
 class DarktraceConnector(BaseConnector):
     def handle_action(self, param: dict):
         """
         Handle an action.
 
-        Takes an action ID from the parameter dictionary and calls the appropriate handler
+        Takes an action ID from the parameter dictionary and calls the appropriate handler.
+        When profiling is enabled, the handler runs under cProfile and the report is stored in
+        the debug data of the action result together with the request timings by endpoint.
         """
         returned_value = phantom.APP_SUCCESS
         action_id = self.get_action_identifier()
         self.debug_print("Running action: ", self.get_action_identifier())
         self.debug_print("Action params: ", param)
 
-        # Special Purpose Actions
-        if action_id == "test_connectivity":
-            returned_value = ConnectivityHandler(self, param)._handle_test_connectivity()
-        elif action_id == "on_poll":
-            returned_value = PollHandler(self, param)._handle_on_poll()
-
-        # Device Actions
-        elif action_id == "get_device_description":
-            returned_value = DeviceHandler(self, param)._handle_get_device_description()
-        elif action_id == "get_device_model_breaches":
-            returned_value = DeviceHandler(self, param)._handle_get_device_model_breaches()
-        elif action_id == "get_device_tags":
-            returned_value = DeviceHandler(self, param)._handle_get_tags_for_device()
-        elif action_id == "get_tagged_devices":
-            returned_value = DeviceHandler(self, param)._handle_get_tagged_devices()
-        elif action_id == "post_tag":
-            returned_value = DeviceHandler(self, param)._handle_post_tag_to_device()
-
-        # Model Breach Actions
-        elif action_id == "post_comment":
-            returned_value = ModelBreachHandler(self, param)._handle_post_comment()
-        elif action_id == "acknowledge_breach":
-            returned_value = ModelBreachHandler(self, param)._handle_acknowledge_breach()
-        elif action_id == "unacknowledge_breach":
-            returned_value = ModelBreachHandler(self, param)._handle_unacknowledge_breach()
-        elif action_id == "get_breach_comments":
-            returned_value = ModelBreachHandler(self, param)._handle_get_breach_comments()
-        elif action_id == "get_breach_connections":
-            returned_value = ModelBreachHandler(self, param)._handle_get_breach_connections()
+        if action_id in ACTION_HANDLERS:
+            handler_class, method_name = ACTION_HANDLERS[action_id]
+            handler = handler_class(self, param)
+            if self.profile_actions:
+                returned_value, report = profile_call(getattr(handler, method_name), self.profile_top_n)
+                handler.action_result.add_debug_data({"profile": report})
+                handler.action_result.add_debug_data({"endpoint_timings": self.endpoint_timings.summary()})
+            else:
+                returned_value = getattr(handler, method_name)()
 
         self.debug_print("Action result: ", returned_value)
+        self.debug_print("Endpoint timings: ", self.endpoint_timings.summary())
 
         return returned_value
 
@@ -94,11 +130,73 @@ class DarktraceConnector(BaseConnector):
         self.should_poll_ai_analyst = config.get("poll_aia")
         self.should_poll_model_breach = config.get("poll_mb")
 
+        # One pooled session shared by every handler and client in this action run
+        self.session = create_session(
+            pool_size=int(config.get("pool_size", DEFAULT_POOL_SIZE)),
+            connect_retries=int(config.get("connect_retries", DEFAULT_CONNECT_RETRIES)),
+            keep_alive=config.get("keep_alive", True),
+        )
+        self.request_slots = threading.BoundedSemaphore(int(config.get("max_concurrent_requests", DEFAULT_MAX_CONCURRENT_REQUESTS)))
+        self.rate_limiter = create_rate_limiter(float(config.get("rate_limit", DEFAULT_RATE_LIMIT)))
+        self.retry_policy = create_retry_policy(int(config.get("max_retries", DEFAULT_MAX_RETRIES)))
+        self.debug_responses = config.get("debug_responses", False)
+        self.endpoint_timings = EndpointTimings()
+
+        # Profiling can also be turned on for the whole instance without changing the asset
+        self.profile_actions = config.get("profile_actions", False) or os.environ.get(PROFILE_ENV_VAR, "").lower() in ("1", "true", "yes")
+        self.profile_top_n = int(config.get("profile_top_n", DEFAULT_PROFILE_TOP_N))
+
+        # Device and tag lookups are cached on disk, shared with other action runs
+        self.response_cache = None
+        if config.get("cache_enabled", True):
+            self.response_cache = ResponseCache(os.path.join(self.get_state_dir(), CACHE_FILE_NAME), CACHE_MAX_ENTRIES)
+
+        # Incremental polling
+        self.poll_overlap_minutes = int(config.get("poll_overlap_minutes", DEFAULT_POLL_OVERLAP_MINUTES))
+        self.mb_first_run_lookback_hours = int(config.get("mb_first_run_lookback_hours", DEFAULT_MB_FIRST_RUN_LOOKBACK_HOURS))
+        self.aia_first_run_lookback_hours = int(config.get("aia_first_run_lookback_hours", DEFAULT_AIA_FIRST_RUN_LOOKBACK_HOURS))
+        self.max_catchup_hours = int(config.get("max_catchup_hours", DEFAULT_MAX_CATCHUP_HOURS))
+        self.dedup_retention_hours = int(config.get("dedup_retention_hours", DEFAULT_DEDUP_RETENTION_HOURS))
+        self.artifact_batch_size = int(config.get("artifact_batch_size", DEFAULT_ARTIFACT_BATCH_SIZE))
+        self.poll_max_seconds = int(config.get("poll_max_seconds", DEFAULT_POLL_MAX_SECONDS))
+        self.poll_max_items = int(config.get("poll_max_items", DEFAULT_POLL_MAX_ITEMS))
+
+        # Backfill of historical model breaches, walked in chunks alongside the regular polls
+        try:
+            self.backfill_start = parse_config_time(config.get("backfill_start"))
+            self.backfill_end = parse_config_time(config.get("backfill_end"))
+        except ValueError as excep:
+            return self.set_status(phantom.APP_ERROR, f"Invalid backfill range: {excep}")
+        self.backfill_order = config.get("backfill_order") or BACKFILL_NEWEST_FIRST
+        self.backfill_chunk_hours = int(config.get("backfill_chunk_hours", DEFAULT_BACKFILL_CHUNK_HOURS))
+        self.backfill_max_breaches = int(config.get("backfill_max_breaches", DEFAULT_BACKFILL_MAX_BREACHES))
+
+        if self.poll_overlap_minutes < 0:
+            return self.set_status(phantom.APP_ERROR, "Poll overlap must not be negative")
+        if self.max_catchup_hours * 60 <= self.poll_overlap_minutes:
+            return self.set_status(phantom.APP_ERROR, "Maximum catch-up span must be longer than the poll overlap")
+        if self.dedup_retention_hours < self.max_catchup_hours:
+            return self.set_status(phantom.APP_ERROR, "Dedup retention must be at least as long as the maximum catch-up span")
+        if self.poll_max_seconds < 0 or self.poll_max_items < 0:
+            return self.set_status(phantom.APP_ERROR, "Poll time and item budgets must not be negative")
+        if self.backfill_end and not self.backfill_start:
+            return self.set_status(phantom.APP_ERROR, "Backfill end requires a backfill start")
+        if self.backfill_start and self.backfill_end and self.backfill_start >= self.backfill_end:
+            return self.set_status(phantom.APP_ERROR, "Backfill start must be before the backfill end")
+        if self.backfill_order not in BACKFILL_ORDERS:
+            return self.set_status(phantom.APP_ERROR, f"Backfill order must be one of: {', '.join(BACKFILL_ORDERS)}")
+        if self.backfill_chunk_hours <= 0 or self.backfill_max_breaches <= 0:
+            return self.set_status(phantom.APP_ERROR, "Backfill chunk hours and maximum breaches per poll must be positive")
+
         return phantom.APP_SUCCESS
 
     def finalize(self):
         # Save the state, this data is saved across actions and app upgrades
         self.save_state(self._state)
+        self.session.close()
+        if self.response_cache is not None:
+            self.debug_print("Response cache stats: ", self.response_cache.stats())
+            self.response_cache.close()
         return phantom.APP_SUCCESS
 
 
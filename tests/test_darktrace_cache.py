@@ -0,0 +1,184 @@
+# Copyright (c) 2025-2026 Splunk Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# File: test_darktrace_cache.py
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+
+"""Tests for the cache of Darktrace API responses"""
+
+import os
+
+import pytest
+
+from darktrace.client import darktrace_cache
+from darktrace.client.darktrace_cache import ResponseCache
+
+
+MASTER_A = "https://master-a.example.com"
+MASTER_B = "https://master-b.example.com"
+
+
+class Clock:
+    """Stand-in for the time module, moved forward by hand"""
+
+    def __init__(self):
+        self.now = 1700000000.0
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def cache_path(tmp_path) -> str:
+    return os.path.join(str(tmp_path), "cache.db")
+
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(darktrace_cache, "time", clock)
+    return clock
+
+
+def test_keys_include_the_master(cache_path):
+    cache = ResponseCache(cache_path, 10)
+    cache.set(MASTER_A, "/devicesummary", {"did": 42}, {"master": "a"}, 60)
+
+    assert cache.get(MASTER_A, "/devicesummary", {"did": 42}) == (True, {"master": "a"})
+    assert cache.get(MASTER_A + "/", "/devicesummary", {"did": 42}) == (True, {"master": "a"})
+    assert cache.get(MASTER_B, "/devicesummary", {"did": 42}) == (False, None)
+
+
+def test_clients_of_different_masters_share_a_cache_file(cache_path, monkeypatch):
+    pytest.importorskip("phantom")
+    from darktrace.client.darktrace_client import DarktraceClient
+
+    clients = {}
+    for base_url, master in ((MASTER_A, "a"), (MASTER_B, "b")):
+        client = DarktraceClient(base_url, "token", "private token", cache=ResponseCache(cache_path, 10))
+        monkeypatch.setattr(client, "get", lambda action_result, query_uri, params=None, master=master: (True, {"master": master}))
+        clients[master] = client
+
+    assert clients["a"].get_device_summary(None, 42) == (True, {"master": "a"})
+    assert clients["b"].get_device_summary(None, 42) == (True, {"master": "b"})
+    assert clients["a"]._cache.hits == 0
+    assert clients["b"]._cache.hits == 0
+    assert clients["a"].get_device_summary(None, 42) == (True, {"master": "a"})
+    assert clients["a"]._cache.hits == 1
+
+
+def test_entries_expire_after_their_ttl(cache_path, clock):
+    cache = ResponseCache(cache_path, 10)
+    cache.set(MASTER_A, "/devicesummary", {"did": 1}, {"did": 1}, 60)
+    cache.set(MASTER_A, "/tags/entities", {"did": 1}, [], 600)
+
+    clock.now += 59
+    assert cache.get(MASTER_A, "/devicesummary", {"did": 1}) == (True, {"did": 1})
+    clock.now += 1
+    assert cache.get(MASTER_A, "/devicesummary", {"did": 1}) == (False, None)
+    assert cache.get(MASTER_A, "/tags/entities", {"did": 1}) == (True, [])
+
+
+def test_least_recently_used_entries_are_evicted(cache_path, clock):
+    cache = ResponseCache(cache_path, 3)
+    for did in (1, 2, 3):
+        clock.now += 1
+        cache.set(MASTER_A, "/devicesummary", {"did": did}, {"did": did}, 600)
+    clock.now += 1
+    assert cache.get(MASTER_A, "/devicesummary", {"did": 1})[0]
+
+    clock.now += 1
+    cache.set(MASTER_A, "/devicesummary", {"did": 4}, {"did": 4}, 600)
+
+    assert [cache.get(MASTER_A, "/devicesummary", {"did": did})[0] for did in (1, 2, 3, 4)] == [True, False, True, True]
+
+
+def test_invalidate(cache_path):
+    cache = ResponseCache(cache_path, 10)
+    cache.set(MASTER_A, "/devicesummary", {"did": 1}, {"did": 1}, 600)
+    cache.set(MASTER_B, "/devicesummary", {"did": 1}, {"did": 1}, 600)
+
+    cache.invalidate(MASTER_A, "/devicesummary", {"did": 1})
+
+    assert cache.get(MASTER_A, "/devicesummary", {"did": 1}) == (False, None)
+    assert cache.get(MASTER_B, "/devicesummary", {"did": 1}) == (True, {"did": 1})
+
+
+def test_post_tag_to_device_invalidates_device_lookups(cache_path, monkeypatch):
+    pytest.importorskip("phantom")
+    from darktrace.client.darktrace_client import DarktraceClient
+
+    client = DarktraceClient(MASTER_A, "token", "private token", cache=ResponseCache(cache_path, 10))
+    monkeypatch.setattr(client, "get", lambda action_result, query_uri, params=None: (True, {"uri": query_uri}))
+    monkeypatch.setattr(client, "post", lambda action_result, query_uri, data=None, urlencoded=False: (True, {}))
+    lookups = (
+        lambda: client.get_device_summary(None, 42),
+        lambda: client.get_tags_for_device(None, 42),
+        lambda: client.get_tagged_devices(None, "Admin"),
+    )
+    for lookup in lookups:
+        lookup()
+    for lookup in lookups:
+        lookup()
+    assert client._cache.hits == 3
+
+    client.post_tag_to_device(None, 42, "Admin")
+    for lookup in lookups:
+        lookup()
+
+    assert client._cache.hits == 3
+    assert client._cache.misses == 6
+
+
+def test_counters(cache_path):
+    cache = ResponseCache(cache_path, 10)
+    cache.get(MASTER_A, "/devicesummary", {"did": 1})
+    cache.set(MASTER_A, "/devicesummary", {"did": 1}, {"did": 1}, 600)
+    cache.get(MASTER_A, "/devicesummary", {"did": 1})
+    cache.get(MASTER_A, "/devicesummary", {"did": 1})
+
+    assert cache.stats() == {"hits": 2, "misses": 1, "hit_rate": 0.667, "total_hits": 2, "total_misses": 1, "total_hit_rate": 0.667}
+    cache.close()
+
+    cache = ResponseCache(cache_path, 10)
+    cache.get(MASTER_A, "/devicesummary", {"did": 2})
+
+    assert cache.stats() == {"hits": 0, "misses": 1, "hit_rate": 0.0, "total_hits": 2, "total_misses": 2, "total_hit_rate": 0.5}
+
+
+def _corrupt_database(path: str) -> str:
+    with open(path, "wb") as corrupt:
+        corrupt.write(b"not an sqlite database" * 100)
+    return path
+
+
+@pytest.mark.parametrize("make_path", [lambda path: os.path.join(path, "missing", "cache.db"), _corrupt_database])
+def test_unavailable_database_is_a_miss(cache_path, make_path):
+    cache = ResponseCache(make_path(cache_path), 10)
+
+    cache.set(MASTER_A, "/devicesummary", {"did": 1}, {"did": 1}, 600)
+    cache.invalidate(MASTER_A, "/devicesummary", {"did": 1})
+
+    assert cache.get(MASTER_A, "/devicesummary", {"did": 1}) == (False, None)
+    assert cache.stats()["misses"] == 1
+    cache.close()
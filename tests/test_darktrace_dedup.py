@@ -0,0 +1,220 @@
+# Copyright (c) 2025-2026 Splunk Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# File: test_darktrace_dedup.py
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+
+"""Tests for the dedup indexes kept in connector state"""
+
+import json
+
+from darktrace.darktrace_dedup import IncidentDigest, SeenIndex
+
+
+HOUR = 3600
+NOW = 1700000000
+
+
+def _round_trip(index: SeenIndex) -> SeenIndex:
+    """Serialize an index through JSON, as connector state is, and load it back"""
+    return SeenIndex.from_state(json.loads(json.dumps(index.to_state())), index.retention_seconds, index.max_entries)
+
+
+def test_seen_index_round_trip():
+    index = SeenIndex(72 * HOUR, 100)
+    for pbid, seen_at in ((42, NOW), (7, NOW - 10), (1000000, NOW - HOUR), (43, NOW)):
+        index.add(pbid, seen_at)
+
+    loaded = _round_trip(index)
+
+    assert len(loaded) == 4
+    assert all(pbid in loaded for pbid in (7, 42, 43, 1000000))
+    assert 8 not in loaded
+    assert loaded.to_state() == index.to_state()
+
+
+def test_seen_index_state_is_compact():
+    index = SeenIndex(72 * HOUR, 100)
+    for pbid in range(5000, 5005):
+        index.add(pbid, NOW + pbid - 5000)
+
+    assert index.to_state() == {"v": 1, "base": NOW, "ids": [5000, 1, 1, 1, 1], "seen": [0, 1, 2, 3, 4]}
+
+
+def test_seen_index_accepts_string_pbids():
+    index = SeenIndex(72 * HOUR, 100)
+    index.add("12", NOW)
+
+    assert 12 in index
+    assert "12" in _round_trip(index)
+
+
+def test_seen_index_keeps_first_seen_time():
+    index = SeenIndex(HOUR, 100)
+    index.add(1, NOW - 2 * HOUR)
+    index.add(1, NOW)
+
+    index.expire(NOW)
+
+    assert 1 not in index
+
+
+def test_seen_index_expires_entries_older_than_retention():
+    index = SeenIndex(HOUR, 100)
+    index.add(1, NOW - HOUR - 1)
+    index.add(2, NOW - HOUR)
+    index.add(3, NOW)
+
+    index.expire(NOW)
+
+    assert 1 not in index
+    assert 2 in index
+    assert 3 in index
+    assert len(_round_trip(index)) == 2
+
+
+def test_seen_index_evicts_oldest_entries_above_size_limit():
+    index = SeenIndex(72 * HOUR, 3)
+    for pbid in range(5):
+        index.add(pbid, NOW + pbid)
+
+    index.expire(NOW + 5)
+
+    assert len(index) == 3
+    assert [pbid in index for pbid in range(5)] == [False, False, True, True, True]
+
+
+def test_seen_index_starts_empty_without_state():
+    assert len(SeenIndex.from_state(None, HOUR, 100)) == 0
+    assert len(SeenIndex.from_state({}, HOUR, 100)) == 0
+    assert len(SeenIndex.from_state({"v": 99, "base": NOW, "ids": [1], "seen": [0]}, HOUR, 100)) == 0
+
+
+def test_seen_index_migrates_legacy_list():
+    index = SeenIndex.from_state(None, 72 * HOUR, 100)
+    index.migrate([5, "6", 5], NOW)
+    index.migrate(None, NOW)
+
+    assert len(index) == 2
+    assert 5 in index
+    assert 6 in index
+    assert _round_trip(index).to_state() == {"v": 1, "base": NOW, "ids": [5, 1], "seen": [0, 0]}
+
+
+def test_seen_index_migration_keeps_existing_entries():
+    index = SeenIndex(HOUR, 100)
+    index.add(5, NOW - 2 * HOUR)
+    loaded = _round_trip(index)
+
+    loaded.migrate([5, 9], NOW)
+    loaded.expire(NOW)
+
+    assert 5 not in loaded
+    assert 9 in loaded
+
+
+def _event(event_id: str, period_end: int) -> dict:
+    return {"id": event_id, "currentGroup": "g1", "periods": [{"start": period_end - 600000, "end": period_end}]}
+
+
+def _round_trip_digest(digest: IncidentDigest) -> IncidentDigest:
+    """Serialize a digest through JSON, as connector state is, and load it back"""
+    return IncidentDigest.from_state(json.loads(json.dumps(digest.to_state())), digest.retention_seconds)
+
+
+def test_incident_digest_new_incident():
+    digest = IncidentDigest(72 * HOUR)
+    events = [_event("a", 1000), _event("b", 2000)]
+
+    new_events, changed = digest.diff("g1", events)
+
+    assert new_events == events
+    assert changed
+    assert digest.container_id("g1") is None
+
+
+def test_incident_digest_round_trip_skips_unchanged_incident():
+    digest = IncidentDigest(72 * HOUR)
+    events = [_event("a", 1000), _event("b", 2000)]
+    digest.record("g1", "101", events, NOW)
+
+    loaded = _round_trip_digest(digest)
+
+    assert loaded.container_id("g1") == "101"
+    assert loaded.diff("g1", events) == ([], False)
+    assert loaded.to_state() == digest.to_state()
+
+
+def test_incident_digest_new_event():
+    digest = IncidentDigest(72 * HOUR)
+    digest.record("g1", "101", [_event("a", 1000)], NOW)
+    new_event = _event("b", 2000)
+
+    new_events, changed = _round_trip_digest(digest).diff("g1", [_event("a", 1000), new_event])
+
+    assert new_events == [new_event]
+    assert changed
+
+
+def test_incident_digest_extended_event_is_a_change():
+    digest = IncidentDigest(72 * HOUR)
+    digest.record("g1", "101", [_event("a", 1000)], NOW)
+
+    new_events, changed = _round_trip_digest(digest).diff("g1", [_event("a", 5000)])
+
+    assert new_events == []
+    assert changed
+
+
+def test_incident_digest_event_version():
+    assert IncidentDigest.event_version({"periods": [{"end": 5}, {"end": 9}, {"start": 1}]}) == 9
+    assert IncidentDigest.event_version({"periods": []}) == 0
+    assert IncidentDigest.event_version({}) == 0
+
+
+def test_incident_digest_record_keeps_container_and_refreshes_seen():
+    digest = IncidentDigest(HOUR)
+    digest.record("g1", "101", [_event("a", 1000)], NOW - 2 * HOUR)
+    digest.record("g1", "202", [], NOW)
+
+    digest.expire(NOW)
+
+    assert digest.container_id("g1") == "101"
+    assert digest.diff("g1", [_event("a", 1000)]) == ([], False)
+
+
+def test_incident_digest_expires_incidents_not_polled_within_retention():
+    digest = IncidentDigest(HOUR)
+    digest.record("g1", "101", [_event("a", 1000)], NOW - HOUR - 1)
+    digest.record("g2", "102", [_event("b", 1000)], NOW - HOUR)
+
+    digest.expire(NOW)
+    loaded = _round_trip_digest(digest)
+
+    assert loaded.container_id("g1") is None
+    assert loaded.container_id("g2") == "102"
+
+
+def test_incident_digest_starts_empty_without_state():
+    assert IncidentDigest.from_state(None, HOUR).to_state() == {"v": 1, "incidents": {}}
+    assert IncidentDigest.from_state({"v": 99, "incidents": {"g1": {}}}, HOUR).container_id("g1") is None
@@ -0,0 +1,95 @@
+# Copyright (c) 2025-2026 Splunk Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# File: test_darktrace_model_breach_handler.py
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+
+"""
+Tests of the model breach actions against the local Darktrace API stand-in.
+
+The Splunk SOAR app SDK (`phantom`) must be importable.
+"""
+
+import tempfile
+
+import pytest
+
+
+pytest.importorskip("phantom")
+
+import phantom.app as phantom
+
+from benchmarks.bench_connector import run_action
+from benchmarks.darktrace_stand_in import PRIVATE_TOKEN, TOKEN, StandInConfig, start_in_process
+from darktrace.client.darktrace_client import DarktraceClient
+
+
+@pytest.fixture
+def stand_in():
+    server = start_in_process(StandInConfig(connections_per_breach=20))
+    yield server
+    server.shutdown()
+
+
+def _config(server) -> dict:
+    return {
+        "base_url": f"http://127.0.0.1:{server.server_address[1]}",
+        "public_token": TOKEN,
+        "private_token": PRIVATE_TOKEN,
+        "tls_verify": False,
+        "cache_enabled": False,
+        "rate_limit": 1000,
+    }
+
+
+def _get_breach_connections(server, **param) -> tuple[bool, list[dict], dict]:
+    status, connector, _ = run_action(_config(server), {}, tempfile.mkdtemp(), "get_breach_connections", {"model_breach_id": "1234", **param})
+    action_result = connector.get_action_results()[-1]
+    return status, action_result.get_data(), action_result.get_summary()
+
+
+@pytest.mark.parametrize("event_type", ["connection", "newconnection", "unusualconnection"])
+def test_get_breach_connections_event_types(stand_in, event_type):
+    status, data, summary = _get_breach_connections(stand_in, event_type=event_type)
+
+    assert status
+    assert len(data) == 20
+    assert summary == {"total_connections": 20, "truncated": False}
+
+
+def test_get_breach_connections_keeps_only_requested_events(stand_in, monkeypatch):
+    events = [
+        {"time": 1, "action": "connection", "eventType": "connection"},
+        {"time": 2, "action": "newconnection", "eventType": "newconnection"},
+        {"time": 3, "action": "unusualconnection", "eventType": "unusualconnection"},
+        {"time": 4, "action": "notice", "eventType": "notice"},
+        {"time": 5, "action": "modelbreach", "eventType": "modelbreach"},
+    ]
+    monkeypatch.setattr(
+        DarktraceClient, "get_breach_connections", lambda self, action_result, model_breach_id, **kwargs: (phantom.APP_SUCCESS, events)
+    )
+
+    status, data, _ = _get_breach_connections(stand_in, event_type="newconnection")
+
+    assert status
+    assert [connection["time"] for connection in data] == ["1", "2"]
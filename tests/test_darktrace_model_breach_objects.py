@@ -0,0 +1,127 @@
+# Copyright (c) 2025-2026 Splunk Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# File: test_darktrace_model_breach_objects.py
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+
+"""Tests for building the containers and artifacts of polled model breaches"""
+
+from datetime import datetime
+
+from darktrace.client.darktrace_model_breach_objects import MODEL_BREACH_TIME_FORMAT, ModelBreachBuilder
+
+
+BASE_URL = "https://darktrace.example.com"
+TIME_MS = 1700000000123
+
+
+def _model_breach(name: str, **overrides) -> dict:
+    model_breach = {
+        "pbid": 1234,
+        "time": TIME_MS,
+        "score": 0.814,
+        "model": {"then": {"name": name, "category": "Critical", "compliance": False, "description": "Line one\\n\\nLine two"}},
+        "device": {"did": 42, "hostname": "host-42", "devicelabel": "Label 42", "ip": "10.0.0.42"},
+    }
+    model_breach.update(overrides)
+    return model_breach
+
+
+def test_build_device_breach():
+    container, artifact = ModelBreachBuilder(BASE_URL).build(_model_breach("Anomalous Connection::Data Sent to Rare Domain"), 7)
+    start_time = datetime.fromtimestamp(TIME_MS // 1000).strftime(MODEL_BREACH_TIME_FORMAT)
+
+    assert container == {
+        "name": "Label 42 breached model Anomalous Connection::Data Sent to Rare Domain with a score of 81%",
+        "description": "Label 42 (42) breached model Anomalous Connection::Data Sent to Rare Domain (1234) with a score of 81%",
+        "start_time": start_time,
+        "severity": "high",
+        "source_data_identifier": 1234,
+        "asset_name": "Darktrace",
+        "score": "81",
+    }
+    assert artifact == {
+        "asset_name": "Darktrace",
+        "container_id": "7",
+        "name": "Data Sent to Rare Domain",
+        "device_label": "Label 42",
+        "type": "Anomalous Connection",
+        "start_time": start_time,
+        "severity": "high",
+        "source_data_identifier": 1234,
+        "description": "Line one Line two",
+        "cef": {
+            "modelBreachId": 1234,
+            "modelBreachUrl": f"{BASE_URL}/#modelbreach/1234",
+            "deviceId": 42,
+            "deviceAddress": "10.0.0.42",
+            "deviceHostname": "host-42",
+            "deviceLabel": "Label 42",
+        },
+    }
+
+
+def test_build_severity():
+    builder = ModelBreachBuilder(BASE_URL)
+    compliance = _model_breach("Compliance::Remote Desktop Protocol")
+    compliance["model"]["then"]["compliance"] = True
+    suspicious = _model_breach("Device::Scan", score=0.9)
+    suspicious["model"]["then"]["category"] = "Suspicious"
+
+    assert builder.build(compliance)[0]["severity"] == "low"
+    assert builder.build(suspicious)[0]["severity"] == "medium"
+
+
+def test_build_system_breach():
+    model_breach = _model_breach("System::System", device={})
+
+    container, artifact = ModelBreachBuilder(BASE_URL).build(model_breach)
+
+    assert container["name"].startswith("Darktrace breached model System::System")
+    assert artifact["container_id"] == ""
+    assert artifact["device_label"] == "Unknown"
+    assert artifact["cef"] == {
+        "modelBreachId": 1234,
+        "modelBreachUrl": f"{BASE_URL}/#modelbreach/1234",
+        "systemNote": "Login to the Darktrace UI to see the system alerts",
+    }
+
+
+def test_build_antigena_breach():
+    model_breach = _model_breach("Antigena::Network::External Threat::Antigena Suspicious File Block")
+    model_breach["model"]["now"] = {"actions": {"antigena": {"action": "quarantine", "duration": 3600}}}
+
+    _, artifact = ModelBreachBuilder(BASE_URL).build(model_breach)
+
+    assert artifact["name"] == "Network / External Threat / Antigena Suspicious File Block"
+    assert artifact["cef"]["antigenaAction"] == "quarantine"
+    assert artifact["cef"]["antigenaDuration"] == "1:00:00"
+
+
+def test_build_batch():
+    model_breaches = [_model_breach("Device::Scan", pbid=pbid, time=TIME_MS + pbid) for pbid in range(3)]
+
+    built = ModelBreachBuilder(BASE_URL).build_batch(model_breaches, "9")
+
+    assert [container["source_data_identifier"] for container, _ in built] == [0, 1, 2]
+    assert all(artifact["container_id"] == "9" for _, artifact in built)
@@ -0,0 +1,238 @@
+# Copyright (c) 2025-2026 Splunk Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# File: test_darktrace_poll.py
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+
+"""
+End to end tests of on_poll against the local Darktrace API stand-in.
+
+SOAR saves are stubbed in memory. The Splunk SOAR app SDK (`phantom`) must be importable.
+"""
+
+import tempfile
+import threading
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+
+pytest.importorskip("phantom")
+
+from benchmarks.bench_connector import BenchConnector
+from benchmarks.darktrace_stand_in import PRIVATE_TOKEN, TOKEN, StandInConfig, start_in_process
+from darktrace.darktrace_utils import POLL_TIME_FORMAT
+
+
+POLL_TIMEOUT = 60
+
+
+@pytest.fixture
+def stand_in():
+    server = start_in_process(StandInConfig(breaches_per_hour=600, events_per_hour=60))
+    yield server
+    server.shutdown()
+
+
+def _config(server, **overrides) -> dict:
+    config = {
+        "base_url": f"http://127.0.0.1:{server.server_address[1]}",
+        "public_token": TOKEN,
+        "private_token": PRIVATE_TOKEN,
+        "tls_verify": False,
+        "poll_mb": True,
+        "poll_aia": False,
+        "cache_enabled": False,
+        "rate_limit": 1000,
+        "mb_first_run_lookback_hours": 6,
+    }
+    config.update(overrides)
+    return config
+
+
+def _poll_in_thread(connector: BenchConnector) -> tuple[threading.Thread, list]:
+    """Run on_poll on a thread, so a hung poll fails the test instead of blocking it"""
+    outcome = []
+
+    def poll():
+        try:
+            if connector.initialize():
+                outcome.append(connector.handle_action({}))
+        except Exception as excep:
+            outcome.append(excep)
+
+    thread = threading.Thread(target=poll, daemon=True)
+    thread.start()
+    thread.join(POLL_TIMEOUT)
+    return thread, outcome
+
+
+class FailingSaveConnector(BenchConnector):
+    def save_container(self, container):
+        raise RuntimeError("save failed")
+
+
+def test_on_poll_returns_when_ingest_raises(stand_in):
+    connector = FailingSaveConnector(_config(stand_in), {}, tempfile.mkdtemp(), "on_poll")
+
+    thread, outcome = _poll_in_thread(connector)
+
+    assert not thread.is_alive(), "on_poll hung after ingesting raised"
+    assert len(outcome) == 1
+    assert isinstance(outcome[0], RuntimeError)
+
+
+class RecordingConnector(BenchConnector):
+    def __init__(self, *args, saved: list, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._saved = saved
+
+    def save_container(self, container):
+        self._saved.append(container)
+        return super().save_container(container)
+
+
+@pytest.mark.parametrize("breach_order", ["oldest", "newest", "shuffled"])
+def test_on_poll_budget_resumes_without_gaps(breach_order):
+    server = start_in_process(StandInConfig(breaches_per_hour=600, events_per_hour=60, breach_order=breach_order))
+    try:
+        config = _config(server, poll_max_items=700)
+        state = {}
+        state_dir = tempfile.mkdtemp()
+        saved = []
+        for _ in range(10):
+            connector = RecordingConnector(config, state, state_dir, "on_poll", saved=saved)
+            assert connector.initialize()
+            assert connector.handle_action({})
+            connector.finalize()
+            if not connector.get_action_results()[-1].get_summary()["budget_exhausted"]:
+                break
+    finally:
+        server.shutdown()
+
+    pbids = sorted(int(container["source_data_identifier"]) for container in saved)
+    assert len(pbids) > 3000
+    assert len(set(pbids)) == len(pbids), "model breaches ingested twice"
+    assert pbids == list(range(pbids[0], pbids[-1] + 1)), "model breaches skipped"
+
+
+@pytest.mark.parametrize("backfill_order", ["oldest first", "newest first"])
+def test_backfill_stops_at_max_breaches_within_a_chunk(stand_in, backfill_order):
+    backfill_start = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0) - timedelta(days=2)
+    config = _config(
+        stand_in,
+        backfill_start=backfill_start.strftime("%Y-%m-%dT%H:%M:%S"),
+        backfill_end=(backfill_start + timedelta(hours=4)).strftime("%Y-%m-%dT%H:%M:%S"),
+        backfill_order=backfill_order,
+        backfill_chunk_hours=4,
+        backfill_max_breaches=500,
+    )
+    state = {}
+    state_dir = tempfile.mkdtemp()
+    saved = []
+    backfilled = []
+    for _ in range(10):
+        connector = RecordingConnector(config, state, state_dir, "on_poll", saved=saved)
+        assert connector.initialize()
+        assert connector.handle_action({})
+        connector.finalize()
+        summary = connector.get_action_results()[-1].get_summary()
+        backfilled.append(summary["backfill_breaches"])
+        if summary["backfill_complete"]:
+            break
+
+    # The 4 hour chunk holds 2401 breaches, one every 6 seconds from its start to its end
+    assert backfilled == [500, 500, 500, 500, 401]
+    backfill_end_pbid = int((backfill_start + timedelta(hours=4)).timestamp() * 1000) // 6000
+    pbids = [int(container["source_data_identifier"]) for container in saved]
+    pbids = sorted(pbid for pbid in pbids if pbid <= backfill_end_pbid)
+    assert len(set(pbids)) == len(pbids) == 2401
+
+
+def test_on_poll_holds_budget_back_for_ai_analyst(stand_in):
+    config = _config(stand_in, poll_aia=True, poll_max_items=1000)
+    saved = []
+    connector = RecordingConnector(config, {}, tempfile.mkdtemp(), "on_poll", saved=saved)
+    assert connector.initialize()
+    assert connector.handle_action({})
+
+    # 3600 model breaches are due, far more than the budget
+    incidents = [container for container in saved if container["name"].startswith("AI Analyst")]
+    assert len(saved) - len(incidents) == 750
+    assert incidents
+
+
+def test_backfill_waits_for_live_model_breaches(stand_in):
+    config = _config(
+        stand_in,
+        poll_aia=True,
+        aia_first_run_lookback_hours=1,
+        poll_max_items=1000,
+        backfill_start=(datetime.now(timezone.utc) - timedelta(days=2)).strftime("%Y-%m-%d"),
+    )
+    state = {}
+    state_dir = tempfile.mkdtemp()
+    summaries = []
+    for _ in range(10):
+        connector = RecordingConnector(config, state, state_dir, "on_poll", saved=[])
+        assert connector.initialize()
+        assert connector.handle_action({})
+        connector.finalize()
+        summaries.append(connector.get_action_results()[-1].get_summary())
+        if summaries[-1]["resume_time"] is None:
+            break
+
+    # 3600 live model breaches are due, and each poll ingests 750 of them
+    assert len(summaries) == 5
+    assert all("backfill_breaches" not in summary for summary in summaries[:-1])
+    assert summaries[-1]["backfill_breaches"] > 0
+
+
+def test_on_poll_time_budget_stops_seen_breaches():
+    server = start_in_process(StandInConfig(breaches_per_hour=600, events_per_hour=60, latency_ms=300))
+    try:
+        state = {}
+        state_dir = tempfile.mkdtemp()
+        first_poll_start = datetime.now(timezone.utc) - timedelta(hours=6)
+        connector = RecordingConnector(_config(server), state, state_dir, "on_poll", saved=[])
+        assert connector.initialize()
+        assert connector.handle_action({})
+        connector.finalize()
+
+        # Poll the same range again, as after an error, with every breach already in the dedup index
+        state["last_poll_mb"] = (first_poll_start + timedelta(minutes=6)).strftime(POLL_TIME_FORMAT)
+        saved = []
+        connector = RecordingConnector(_config(server, poll_max_seconds=1), state, state_dir, "on_poll", saved=saved)
+        assert connector.initialize()
+        assert connector.handle_action({})
+        connector.finalize()
+    finally:
+        server.shutdown()
+
+    summary = connector.get_action_results()[-1].get_summary()
+    assert not saved
+    assert summary["budget_exhausted"] == "time"
+    # The poll stops within a few slices of its second, instead of streaming the 3600 breaches already seen
+    assert summary["items_parsed"] < 2000
+    assert summary["resume_time"] is not None
+    assert state["mb_resume"] == summary["resume_time"]
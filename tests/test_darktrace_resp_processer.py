@@ -0,0 +1,147 @@
+# Copyright (c) 2025-2026 Splunk Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# File: test_darktrace_resp_processer.py
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+
+"""Tests for decoding streamed JSON array responses"""
+
+import json
+
+import pytest
+
+
+pytest.importorskip("phantom")
+
+from phantom.action_result import ActionResult
+
+from darktrace.client.darktrace_resp_processer import JSONArrayStream
+
+
+VALID_BODIES = [
+    "[]",
+    " \n[ \t]\r\n",
+    "[1]",
+    '[1, 22, 333.5, -4e3, 0, "a,]b", "\\"]", null, true, false]',
+    '[{"pbid": 1, "model": {"name": "A::B", "tags": ["x", "]"]}}, {"pbid": 2, "nested": [[], [[1]], {}]}]',
+    '["café", "✓", "\U0001f600", "\\u00e9"]',
+    "[\n  12345678901234567890,\n  1.5e-10\n]\n",
+]
+
+INVALID_BODIES = [
+    "",
+    "   ",
+    '{"a": 1}',
+    "[",
+    "[1",
+    "[1,",
+    "[1,]",
+    "[1 2]",
+    "[1]junk",
+    "[1] 2",
+    "[]x",
+    '[{"a": 1}]]',
+    '[{"a": 1]',
+    '["unterminated]',
+]
+
+
+class ChunkedResponse:
+    """Response whose body is downloaded in the given chunks"""
+
+    def __init__(self, chunks: list[bytes]):
+        self._chunks = chunks
+        self.encoding = "utf-8"
+        self.closed = False
+
+    def iter_content(self, chunk_size: int):
+        yield from self._chunks
+
+    def close(self):
+        self.closed = True
+
+
+def _decode(chunks: list[bytes], chunk_size: int = 4) -> tuple[list, JSONArrayStream, ActionResult]:
+    action_result = ActionResult()
+    response = ChunkedResponse(chunks)
+    stream = JSONArrayStream(response, action_result, chunk_size=chunk_size)  # type: ignore
+    items = list(stream)
+    assert response.closed
+    return items, stream, action_result
+
+
+def _splits(body: bytes):
+    """The body split in two at every byte offset, and in single bytes"""
+    for offset in range(len(body) + 1):
+        yield [body[:offset], body[offset:]]
+    yield [body[index : index + 1] for index in range(len(body))]
+
+
+@pytest.mark.parametrize("body", VALID_BODIES)
+def test_valid_array_at_every_chunk_boundary(body):
+    encoded = body.encode("utf-8")
+    expected = json.loads(body)
+    for chunks in _splits(encoded):
+        items, stream, _ = _decode(chunks)
+        assert items == expected, chunks
+        assert not stream.failed, chunks
+        assert stream.count == len(expected)
+        assert stream.bytes_read == len(encoded)
+
+
+@pytest.mark.parametrize("body", INVALID_BODIES)
+def test_invalid_array_fails_at_every_chunk_boundary(body):
+    for chunks in _splits(body.encode("utf-8")):
+        _, stream, action_result = _decode(chunks)
+        assert stream.failed, chunks
+        assert isinstance(stream.error, ValueError)
+        assert not action_result.get_status()
+
+
+def test_items_before_an_error_are_yielded():
+    items, stream, _ = _decode([b'[1, {"a": 2}, 3]junk'])
+
+    assert items == [1, {"a": 2}, 3]
+    assert stream.failed
+
+
+def test_large_item_across_many_chunks():
+    item = {"data": "x" * 100000, "values": list(range(1000))}
+    body = json.dumps([item, 1]).encode("utf-8")
+
+    items, stream, _ = _decode([body[index : index + 1000] for index in range(0, len(body), 1000)], chunk_size=1000)
+
+    assert items == [item, 1]
+    assert not stream.failed
+
+
+def test_stopping_early_closes_response():
+    response = ChunkedResponse([b"[1, 2, 3]"])
+    stream = JSONArrayStream(response, ActionResult())  # type: ignore
+    iterator = iter(stream)
+
+    assert next(iterator) == 1
+    iterator.close()
+
+    assert response.closed
+    assert not stream.failed
@@ -0,0 +1,190 @@
+# Copyright (c) 2025-2026 Splunk Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# File: test_darktrace_retry.py
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+
+"""Tests for the rate limiting and retries of requests to the Darktrace API"""
+
+import io
+from email.utils import formatdate
+from typing import Optional
+
+import pytest
+import requests
+
+from darktrace.client import darktrace_retry
+from darktrace.client.darktrace_retry import RetryPolicy, TokenBucket
+
+
+class Clock:
+    """Stand-in for the time module, where sleeping moves the clock forward"""
+
+    def __init__(self):
+        # Small enough for the clock to resolve the short waits of the token bucket
+        self.now = 1000.0
+        self.slept = []
+
+    def time(self) -> float:
+        return self.now
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(darktrace_retry, "time", clock)
+    return clock
+
+
+def _policy(max_retries: int = 3, endpoint_budgets: Optional[dict] = None, default_budget: int = 10) -> RetryPolicy:
+    return RetryPolicy(max_retries, 1.0, 60.0, endpoint_budgets or {}, default_budget)
+
+
+def _response(status_code: int, retry_after: Optional[str] = None) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status_code
+    response.raw = io.BytesIO(b"")
+    if retry_after is not None:
+        response.headers["Retry-After"] = retry_after
+    return response
+
+
+@pytest.mark.parametrize(
+    "query_uri, endpoint",
+    [
+        ("/modelbreaches/1/acknowledge", "/modelbreaches"),
+        ("/modelbreaches", "/modelbreaches"),
+        ("/tags/entities?did=1", "/tags/entities"),
+        ("/aianalyst/incidentevents", "/aianalyst/incidentevents"),
+    ],
+)
+def test_endpoint(query_uri, endpoint):
+    assert RetryPolicy.endpoint(query_uri) == endpoint
+
+
+def test_retry_after_in_seconds():
+    assert _policy().delay(0, _response(429, "5")) == 5.0
+    assert _policy().delay(0, _response(429, "120")) == 60.0
+
+
+def test_retry_after_as_http_date(clock):
+    response = _response(503, formatdate(clock.now + 30, usegmt=True))
+
+    assert _policy().delay(0, response) == 30.0
+    assert _policy().delay(0, _response(503, formatdate(clock.now - 30, usegmt=True))) == 0.0
+
+
+def test_backoff_without_retry_after():
+    for attempt in range(5):
+        assert 0 <= _policy().delay(attempt, _response(503, "soon")) <= min(60.0, 2**attempt)
+
+
+@pytest.mark.parametrize("status_code", [429, 502, 503, 504])
+def test_get_retried_on_retryable_statuses(status_code):
+    assert _policy().should_retry("/devices", "GET", 0, response=_response(status_code))
+
+
+@pytest.mark.parametrize("status_code, retried", [(429, True), (503, True), (502, False), (504, False), (500, False)])
+def test_post_retried_only_when_not_processed(status_code, retried):
+    assert _policy().should_retry("/modelbreaches/1/acknowledge", "POST", 0, response=_response(status_code)) is retried
+
+
+@pytest.mark.parametrize("exception", [requests.Timeout(), requests.ConnectionError()])
+def test_post_not_retried_after_timeout(exception):
+    policy = _policy()
+
+    assert not policy.should_retry("/modelbreaches/1/acknowledge", "POST", 0, exception=exception)
+    assert policy.should_retry("/modelbreaches", "GET", 0, exception=exception)
+
+
+def test_max_retries():
+    policy = _policy(max_retries=2)
+
+    assert policy.should_retry("/devices", "GET", 1, response=_response(503))
+    assert not policy.should_retry("/devices", "GET", 2, response=_response(503))
+
+
+def test_endpoint_budget_exhaustion():
+    policy = _policy(endpoint_budgets={"/modelbreaches": 2}, default_budget=1)
+
+    assert policy.should_retry("/modelbreaches/1/acknowledge", "POST", 0, response=_response(429))
+    assert policy.should_retry("/modelbreaches/2/acknowledge", "POST", 0, response=_response(429))
+    assert not policy.should_retry("/modelbreaches", "GET", 0, response=_response(503))
+    assert policy.should_retry("/devices", "GET", 0, response=_response(503))
+    assert not policy.should_retry("/devices", "GET", 0, response=_response(503))
+    assert policy.retries == 3
+
+
+def test_token_bucket_allows_bursts_then_waits(clock):
+    bucket = TokenBucket(10, 5)
+
+    for _ in range(5):
+        bucket.acquire()
+    assert clock.slept == []
+
+    bucket.acquire()
+    assert clock.slept == [pytest.approx(0.1)]
+
+
+def test_token_bucket_without_limit(clock):
+    bucket = TokenBucket(0, 1)
+
+    for _ in range(100):
+        bucket.acquire()
+
+    assert clock.slept == []
+
+
+class FakeSession:
+    """Session answering with the given statuses in turn, recording the headers of each request"""
+
+    def __init__(self, *status_codes: int):
+        self.status_codes = list(status_codes)
+        self.headers = []
+
+    def request(self, method, url, headers, **kwargs):
+        self.headers.append(headers)
+        return _response(self.status_codes.pop(0), "0.01")
+
+
+def test_request_retry_is_signed_again():
+    pytest.importorskip("phantom")
+    from darktrace.client.darktrace_client import DarktraceClient
+
+    session = FakeSession(503, 200)
+    client = DarktraceClient("https://master.example.com", "token", "private token", session=session, retry_policy=_policy())
+
+    response = client._request("/devices", "GET", params={"did": 1})
+
+    assert response.status_code == 200
+    first, second = session.headers
+    assert first["DTAPI-Date"] != second["DTAPI-Date"]
+    for headers in session.headers:
+        assert headers["DTAPI-Signature"] == client._signing.sign("/devices", headers["DTAPI-Date"], "did=1")
@@ -0,0 +1,68 @@
+# Copyright (c) 2025-2026 Splunk Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# File: test_darktrace_signing.py
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+
+"""Tests for the signing of Darktrace API requests"""
+
+import hashlib
+import hmac
+
+import pytest
+
+from darktrace.client.darktrace_signing import SigningContext
+
+
+TOKEN = "0123456789abcdef0123456789abcdef01234567"
+DATE = "2025-01-01T00:00:00.000000+00:00"
+
+
+def _expected(private_token: str, message: str) -> str:
+    return hmac.new(private_token.encode("ASCII"), message.encode("ASCII"), hashlib.sha1).hexdigest()
+
+
+@pytest.mark.parametrize("private_token", ["fedcba9876543210fedcba9876543210fedcba98", "k", "x" * 100])
+def test_sign_matches_hmac(private_token):
+    signing = SigningContext(TOKEN, private_token)
+
+    assert signing.sign("/modelbreaches", DATE) == _expected(private_token, f"/modelbreaches\n{TOKEN}\n{DATE}")
+    assert signing.sign("/devices", DATE, "did=1") == _expected(private_token, f"/devices?did=1\n{TOKEN}\n{DATE}")
+
+
+def test_sign_is_repeatable():
+    signing = SigningContext(TOKEN, "secret")
+
+    assert signing.sign("/devices", DATE, "did=1") == signing.sign("/devices", DATE, "did=1")
+    assert signing.sign("/devices", DATE, "did=1") != signing.sign("/devices", DATE, "did=2")
+
+
+def test_headers():
+    signing = SigningContext(TOKEN, "secret")
+
+    headers = signing.headers("/tags/entities", "did=1&tag=Admin", urlencoded=True)
+
+    assert headers["DTAPI-Token"] == TOKEN
+    assert headers["DTAPI-Signature"] == signing.sign("/tags/entities", headers["DTAPI-Date"], "did=1&tag=Admin")
+    assert headers["Content-Type"].startswith("application/x-www-form-urlencoded")
+    assert "Content-Type" not in signing.headers("/devices")
@@ -0,0 +1,100 @@
+# Copyright (c) 2025-2026 Splunk Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# File: test_darktrace_utils.py
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+
+"""Tests for the JSON field accessors, which must behave exactly as nget"""
+
+import pytest
+
+from darktrace.darktrace_utils import NPaths, nget, npath
+
+
+STRUCTURE = {
+    "model": {"then": {"name": "Device::Scan", "category": "", "compliance": None, "tags": ["a", "b"]}},
+    "device": {"did": 0, "hostname": "workstation", "ips": [{"ip": "10.0.0.1"}], "deep": {"a": {"b": {"c": {"d": "found"}}}}},
+    "breachDevices": [],
+    "empty": {},
+    "flag": False,
+}
+
+PATHS = [
+    # Present values, including falsy ones that are not None or ""
+    ("model", "then", "name"),
+    ("device", "did"),
+    ("flag",),
+    ("device", "ips", 0, "ip"),
+    ("device", "deep", "a", "b", "c", "d"),
+    # Missing keys
+    ("missing",),
+    ("model", "missing"),
+    ("model", "then", "missing"),
+    ("device", "deep", "a", "b", "missing", "d"),
+    # None and empty string
+    ("model", "then", "compliance"),
+    ("model", "then", "category"),
+    ("empty",),
+    # List index out of range
+    ("breachDevices", 0),
+    ("breachDevices", 0, "ip"),
+    ("model", "then", "tags", 2),
+    ("device", "ips", 1, "ip"),
+    # Indexing into a str, by position and by key
+    ("model", "then", "name", 0),
+    ("model", "then", "name", "first"),
+    ("model", "then", "name", 100),
+    # Indexing into other scalars
+    ("device", "did", 0),
+    ("flag", "value"),
+    # No fields
+    (),
+]
+
+
+@pytest.mark.parametrize("path", PATHS)
+@pytest.mark.parametrize("default", ["Unknown", ""])
+def test_npath_matches_nget(path, default):
+    assert npath(*path, default=default)(STRUCTURE) == nget(STRUCTURE, *path, default=default)
+
+
+@pytest.mark.parametrize("default", ["Unknown", ""])
+def test_npaths_matches_nget(default):
+    extract = NPaths(*PATHS, default=default)
+
+    assert extract(STRUCTURE) == tuple(nget(STRUCTURE, *path, default=default) for path in PATHS)
+
+
+@pytest.mark.parametrize("structure", [None, "string", [], [STRUCTURE], {}, 42])
+def test_accessors_match_nget_on_other_structures(structure):
+    paths = [(0,), (0, "model"), ("model", "then", "name"), (0, "model", "then", "name"), ("a", "b", "c", "d")]
+
+    expected = tuple(nget(structure, *path) for path in paths)
+    assert tuple(npath(*path)(structure) for path in paths) == expected
+    assert NPaths(*paths)(structure) == expected
+
+
+def test_npaths_field_names_are_not_code():
+    extract = NPaths(("model", "then", "name"), ('")\nraise SystemExit(1)\n("',))
+
+    assert extract(STRUCTURE) == ("Device::Scan", "Unknown")